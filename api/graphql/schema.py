@@ -1,5 +1,7 @@
 import strawberry  # noqa
 
+from core.graphql import UnitOfWorkExtension
+
 from .user.query import UserQuery
 
 
@@ -22,5 +24,6 @@ class Query(
 
 
 gql_schema = strawberry.Schema(
-    query=Query  # , mutation=Mutation, subscription=Subscription
+    query=Query,  # mutation=Mutation, subscription=Subscription
+    extensions=[UnitOfWorkExtension],
 )
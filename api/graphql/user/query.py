@@ -3,8 +3,10 @@ from typing import List, Optional
 import strawberry
 from strawberry.types import Info
 
+from apps.user.entities import User
 from apps.user.protocols import UserServiceProtocol
-from core.graphql import get_service
+from core.graphql import CountMode, get_loader, get_service
+from core.uid_gen import FelicityID
 
 from .types import UserType
 
@@ -12,11 +14,15 @@ from .types import UserType
 @strawberry.type(description="Query all entities")
 class UserQuery:
     @strawberry.field(description="Get an Author")
-    def user(self, uid: int, info: Info) -> Optional[UserType]:
-        user_service: UserServiceProtocol = get_service(info, "user_service")
-        return user_service.find(uid)
+    async def user(self, uid: FelicityID, info: Info) -> Optional[UserType]:
+        return await get_loader(info, User).load(uid)
 
     @strawberry.field(description="List all Authors")
-    def users(self, info: Info) -> List[UserType]:
+    async def users(self, info: Info) -> List[UserType]:
+        user_service: UserServiceProtocol = get_service(info, "user_service")
+        return await user_service.list()
+
+    @strawberry.field(description="Count Authors")
+    async def users_count(self, info: Info, mode: CountMode = CountMode.EXACT) -> int:
         user_service: UserServiceProtocol = get_service(info, "user_service")
-        return user_service.list()
+        return await user_service.count(mode=mode)
@@ -1,7 +1,10 @@
 import strawberry
 
+from core.uid_gen import FelicityID
+
 
 @strawberry.type
 class UserType:
+    uid: FelicityID
     first_name: str
     last_name: str
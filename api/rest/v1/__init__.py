@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 
+from .database import DatabaseRouter
 from .user import UserRouter
 
 api_router = APIRouter()
 api_router.include_router(UserRouter, prefix="/users", tags=["users"])
+api_router.include_router(DatabaseRouter, prefix="/database", tags=["database"])
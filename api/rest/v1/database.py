@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+
+from core.database.cache import entity_cache
+from core.database.db import get_async_engine, get_replica_engines
+from core.database.result_cache import result_cache
+from core.database.single_flight import single_flight
+from core.database.telemetry import pool_telemetries
+
+DatabaseRouter = APIRouter()
+
+
+@DatabaseRouter.get("/pool")
+def pool_stats():
+    """Pool statistics per engine, keyed "primary", "replica-0", ..."""
+    get_async_engine()
+    get_replica_engines()
+    return {label: t.stats() for label, t in pool_telemetries.items()}
+
+
+@DatabaseRouter.get("/cache")
+def cache_stats():
+    return entity_cache.stats()
+
+
+@DatabaseRouter.get("/single-flight")
+def single_flight_stats():
+    return single_flight.stats()
+
+
+@DatabaseRouter.get("/result-cache")
+def result_cache_stats():
+    return result_cache.stats()
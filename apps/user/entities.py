@@ -3,6 +3,7 @@ from core.database.entity import DBModel
 
 class User(DBModel):
     __tablename__ = "user"
+    __cache_entities__ = True
 
     # first_name: Mapped[str] = mapped_column(
     #     String(20), nullable=False
@@ -1,4 +1,7 @@
-from typing import Protocol, TypeVar
+from typing import List, Protocol, TypeVar
+
+from core.database.counting import CountMode
+from core.uid_gen import FelicityIDType
 
 from .entities import User
 
@@ -9,5 +12,11 @@ class UserServiceProtocol(Protocol):
     def create(self, user) -> UserType:
         ...
 
-    def find(self, uid: str) -> UserType:
+    async def find(self, uid: FelicityIDType) -> UserType:
+        ...
+
+    async def list(self) -> List[UserType]:
+        ...
+
+    async def count(self, filters=None, mode: CountMode = CountMode.EXACT) -> int:
         ...
@@ -1,8 +1,8 @@
 from fastapi import Depends
-from sqlalchemy.orm import Session
 
-from core.database.deps import get_session
+from core.database.deps import get_unit_of_work
 from core.database.repository import BaseRepository
+from core.database.uow import UnitOfWork
 
 from .entities import User
 
@@ -10,5 +10,7 @@ from .entities import User
 class UserRepository(BaseRepository):
     model = User
 
-    def __init__(self, session_factory: Session = Depends(get_session)):
-        self.session_factory = session_factory
+    def __init__(self, uow: UnitOfWork = Depends(get_unit_of_work)):
+        self.uow = uow
+        self.session_factory = uow.session_factory
+        self.read_session_factory = uow.read_session_factory
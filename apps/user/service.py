@@ -1,5 +1,8 @@
+from typing import List
+
 from fastapi import Depends
 
+from core.database.counting import CountMode
 from core.database.protocols import RepositoryProtocol
 
 from .entities import User
@@ -14,3 +17,12 @@ class UserService:
 
     def create(self, user) -> User:
         return self.repository.create({})
+
+    async def find(self, uid) -> User:
+        return await self.repository.find(uid)
+
+    async def list(self) -> List[User]:
+        return await self.repository.all()
+
+    async def count(self, filters=None, mode: CountMode = CountMode.EXACT) -> int:
+        return await self.repository.count_where(filters, mode)
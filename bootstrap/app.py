@@ -18,8 +18,12 @@ from strawberry.subscriptions import (GRAPHQL_TRANSPORT_WS_PROTOCOL,
 from api.graphql.schema import gql_schema  # noqa
 from api.rest.v1 import api_router  # noqa
 from core.config import settings  # noqa
-from core.database.db import get_sync_engine
+from core.database.db import dispose_db, get_sync_engine, init_db
+from core.database.middleware import UnitOfWorkMiddleware
+from core.database.notify import start_change_listener, stop_change_listener
 from core.graphql.acquire import get_graphql_context
+from core.uid_gen import (acquire_worker_lease, release_worker_lease,
+                          start_uid_pool, stop_uid_pool)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,14 +32,22 @@ logger = logging.getLogger(__name__)
 def register_app_events(app: FastAPI):
     @app.on_event("startup")
     async def startup():
-        ...
+        worker_id = acquire_worker_lease()
+        logger.info(f"uid worker id: {worker_id}")
+        start_uid_pool()
+        await init_db()
+        await start_change_listener()
 
     @app.on_event("shutdown")
     async def shutdown():
-        ...
+        await stop_change_listener()
+        stop_uid_pool()
+        release_worker_lease()
+        await dispose_db()
 
 
 def register_app_middlewares(app: FastAPI):
+    app.add_middleware(UnitOfWorkMiddleware)
     if settings.BACKEND_CORS_ORIGINS:
         app.add_middleware(
             CORSMiddleware,
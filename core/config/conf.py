@@ -1,4 +1,5 @@
 import os
+import tempfile
 from typing import Any, Dict, List, Optional, Union
 
 from pydantic import (AnyHttpUrl, AnyUrl, BaseSettings, EmailStr, HttpUrl,
@@ -77,6 +78,10 @@ class Settings(BaseSettings):
     SQLALCHEMY_ASYNC_DATABASE_URI: Optional[PostgresDsn] = None
     SQLALCHEMY_TEST_DATABASE_URI: Optional[PostgresDsn] = None
     SQLALCHEMY_TEST_ASYNC_DATABASE_URI: Optional[PostgresDsn] = None
+    # comma separated read replicas, repository reads are balanced over them
+    SQLALCHEMY_REPLICA_ASYNC_DATABASE_URIS: List[PostgresDsn] = getenv_value(
+        "DB_REPLICA_URIS", ""
+    )
 
     @validator("SQLALCHEMY_DATABASE_URI", pre=True)
     def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
@@ -132,6 +137,12 @@ class Settings(BaseSettings):
             path=f"/test_{values.get('POSTGRES_DB') or ''}",
         )
 
+    @validator("SQLALCHEMY_REPLICA_ASYNC_DATABASE_URIS", pre=True)
+    def assemble_replica_connections(cls, v: Union[str, List[str]]) -> List[str]:
+        if isinstance(v, str):
+            return [i.strip() for i in v.split(",") if i.strip()]
+        return v
+
     SMTP_TLS: bool = getenv_boolean("SMTP_TLS", False)
     SMTP_PORT: Optional[int] = getenv_value("SMTP_PORT", 1025)
     SMTP_HOST: Optional[str] = getenv_value("SMTP_HOST", "localhost")
@@ -177,6 +188,60 @@ class Settings(BaseSettings):
 
     LOAD_SETUP_DATA = getenv_boolean("LOAD_SETUP_DATA", False)
     SERVE_WEBAPP = getenv_boolean("SERVE_WEBAPP", True)
+    # Unique ids: store uids as BIGINT rather than strings
+    UID_BIGINT = getenv_boolean("UID_BIGINT", False)
+    # Database
+    DB_ECHO = getenv_boolean("DB_ECHO", False)
+    DB_POOL_WARM_CONNECTIONS: int = getenv_value("DB_POOL_WARM_CONNECTIONS", 5)
+    DB_POOL_SIZE: int = getenv_value("DB_POOL_SIZE", 5)
+    DB_MAX_OVERFLOW: int = getenv_value("DB_MAX_OVERFLOW", 10)
+    DB_POOL_RECYCLE: int = getenv_value("DB_POOL_RECYCLE", 1800)  # seconds, -1 never
+    DB_POOL_TIMEOUT: int = getenv_value("DB_POOL_TIMEOUT", 30)  # seconds
+    # asyncpg prepared statements kept per connection, 0 disables the cache
+    DB_STATEMENT_CACHE_SIZE: int = getenv_value("DB_STATEMENT_CACHE_SIZE", 100)
+    # Time windows can be answered from uid ranges, making this index optional
+    DB_INDEX_CREATED_AT = getenv_boolean("DB_INDEX_CREATED_AT", True)
+    # Rows per COPY / executemany batch (and savepoint) in bulk inserts
+    DB_BULK_CHUNK_SIZE: int = getenv_value("DB_BULK_CHUNK_SIZE", 5000)
+    # Rows fetched per round trip by the streaming iterators
+    DB_STREAM_FETCH_SIZE: int = getenv_value("DB_STREAM_FETCH_SIZE", 1000)
+    # Cached counts: seconds an exact count is reused, and how many are kept
+    DB_COUNT_CACHE_TTL: int = getenv_value("DB_COUNT_CACHE_TTL", 30)
+    DB_COUNT_CACHE_SIZE: int = getenv_value("DB_COUNT_CACHE_SIZE", 1024)
+    # Entity cache for models opting in with `__cache_entities__ = True`
+    DB_ENTITY_CACHE_TTL: int = getenv_value("DB_ENTITY_CACHE_TTL", 60)
+    DB_ENTITY_CACHE_SIZE: int = getenv_value("DB_ENTITY_CACHE_SIZE", 10000)
+    # Host wide entity cache tier shared by the workers through a mapped file
+    DB_SHM_CACHE_ENABLED = getenv_boolean("DB_SHM_CACHE_ENABLED", False)
+    DB_SHM_CACHE_PATH: str = getenv_value(
+        "DB_SHM_CACHE_PATH",
+        os.path.join(
+            "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+            "starter-entity-cache",
+        ),
+    )
+    DB_SHM_CACHE_SIZE_MB: int = getenv_value("DB_SHM_CACHE_SIZE_MB", 64)
+    DB_SHM_CACHE_SLOT_SIZE: int = getenv_value("DB_SHM_CACHE_SLOT_SIZE", 1024)
+    # Identical concurrent reads share one query
+    DB_SINGLE_FLIGHT = getenv_boolean("DB_SINGLE_FLIGHT", True)
+    # Query results of models opting in with `__cache_results__ = True`
+    DB_RESULT_CACHE_TTL: int = getenv_value("DB_RESULT_CACHE_TTL", 30)
+    DB_RESULT_CACHE_SIZE_MB: int = getenv_value("DB_RESULT_CACHE_SIZE_MB", 32)
+    # Cross worker cache invalidation through LISTEN/NOTIFY
+    DB_NOTIFY_ENABLED = getenv_boolean("DB_NOTIFY_ENABLED", True)
+    DB_NOTIFY_CHANNEL: str = getenv_value("DB_NOTIFY_CHANNEL", "starter_changes")
+    # Unique ids: worker slot leasing backend, one of "file", "db" or "none"
+    UID_LEASE_BACKEND: str = getenv_value("UID_LEASE_BACKEND", "file")
+    UID_LEASE_DIR: str = getenv_value(
+        "UID_LEASE_DIR", os.path.join(tempfile.gettempdir(), "starter-uid-leases")
+    )
+    UID_LEASE_SLOTS: int = getenv_value("UID_LEASE_SLOTS", 64)
+    UID_LEASE_TTL: int = getenv_value("UID_LEASE_TTL", 60)
+    # Unique ids: pre-generated uid pool, 0 disables it
+    UID_POOL_DEPTH: int = getenv_value("UID_POOL_DEPTH", 0)
+    UID_POOL_REFILL_AT: Optional[int] = getenv_value("UID_POOL_REFILL_AT", None)
+    # pooled uids older than this are dropped, they carry their creation time
+    UID_POOL_MAX_AGE_MS: int = getenv_value("UID_POOL_MAX_AGE_MS", 1000)
     # Tracing
     RUN_OPEN_TRACING = getenv_boolean("RUN_OPEN_TRACING", False)
     OTLP_SPAN_EXPORT_URL = getenv_value("OTLP_SPAN_EXPORT_URL", "http://localhost:4317")
@@ -0,0 +1,129 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import Table, insert
+from sqlalchemy.dialects import postgresql
+
+from core.uid_gen import get_flake_uids
+
+
+@dataclass
+class ChunkFailure:
+    index: int  # chunk number
+    offset: int  # position of the chunk's first row in the input
+    size: int
+    error: str
+
+
+@dataclass
+class BulkResult:
+    inserted: int = 0
+    uids: List[Any] = field(default_factory=list)
+    failures: List[ChunkFailure] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+
+def _default(column):
+    default = column.default
+    if default is None or default.is_sequence or default.is_clause_element:
+        return None
+    if default.is_callable:
+        return default.arg(None)
+    return default.arg
+
+
+async def bulk_records(table: Table, rows: List[dict]) -> Tuple[List[str], List[tuple]]:
+    """
+    Column names and value tuples for a raw insert of `rows`. Rows without
+    a uid get one from a single batched reservation, made off the event
+    loop since it may wait for the clock, other missing values fall back
+    to the column's python side default.
+    """
+    names = {name for row in rows for name in row}
+    names.add("uid")
+    columns = [c for c in table.columns if c.name in names or _default(c) is not None]
+    unknown = names - {c.name for c in columns}
+    if unknown:
+        raise KeyError(f"Unknown columns for {table.name}: {sorted(unknown)}")
+
+    missing = sum(1 for row in rows if row.get("uid") is None)
+    uids: Iterator[Any] = iter(())
+    if missing:
+        loop = asyncio.get_running_loop()
+        uids = iter(await loop.run_in_executor(None, get_flake_uids, missing))
+    records = []
+    for row in rows:
+        record = []
+        for column in columns:
+            value = row.get(column.name)
+            if value is None:
+                value = next(uids) if column.name == "uid" else _default(column)
+            record.append(value)
+        records.append(tuple(record))
+    return [c.name for c in columns], records
+
+
+async def copy_records(session, table: Table, columns: List[str], records):
+    """COPY the records in through the session's asyncpg connection"""
+    connection = await session.connection()
+    dialect = connection.dialect
+    processors = [
+        table.c[name].type.dialect_impl(dialect).bind_processor(dialect)
+        for name in columns
+    ]
+    if any(processors):
+        records = [
+            tuple(p(v) if p else v for p, v in zip(processors, record))
+            for record in records
+        ]
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        table.name, records=records, columns=columns, schema_name=table.schema
+    )
+
+
+async def insert_records(
+    session, table: Table, columns: List[str], records: Sequence[tuple]
+):
+    """Multi row insert, for drivers without COPY"""
+    params: List[Dict[str, Any]] = [dict(zip(columns, r)) for r in records]
+    await session.execute(insert(table), params)
+
+
+def dedupe(
+    columns: List[str], records: List[tuple], keys: Sequence[str]
+) -> List[tuple]:
+    """
+    Last record wins per key, ON CONFLICT can only touch a row once. Run
+    it on the output of bulk_records so that generated uids are part of
+    the key. Keys holding a NULL never conflict, those records are kept.
+    """
+    if not set(keys) <= set(columns):
+        return list(records)  # a key column left out is NULL in every row
+    at = [columns.index(k) for k in keys]
+    unique: Dict[Any, tuple] = {}
+    for index, record in enumerate(records):
+        key = tuple(record[i] for i in at)
+        unique[index if any(v is None for v in key) else key] = record
+    return list(unique.values())
+
+
+def upsert_statement(
+    model, values: List[dict], conflict_cols: Sequence[str], update_cols: Sequence[str]
+):
+    stmt = postgresql.insert(model).values(values)
+    if not update_cols:
+        return stmt.on_conflict_do_nothing(index_elements=conflict_cols)
+    return stmt.on_conflict_do_update(
+        index_elements=conflict_cols,
+        set_={name: stmt.excluded[name] for name in update_cols},
+    )
+
+
+async def supports_copy(session) -> bool:
+    connection = await session.connection()
+    return connection.dialect.driver == "asyncpg"
@@ -0,0 +1,205 @@
+"""
+Read-through entity cache for uid lookups.
+
+Entities are cached as snapshots of their column values, keyed by table
+and uid, and come back as detached instances (or merged into the unit
+of work's session). Only models setting `__cache_entities__ = True` are
+cached: relationships are not part of the snapshot and cannot be lazy
+loaded from a detached instance.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from core.config import settings
+
+Key = Tuple[str, str]
+
+
+class CacheTier(Protocol):
+    def __len__(self) -> int:
+        ...
+
+    def get(self, key: Key) -> Optional[dict]:
+        ...
+
+    def set(self, key: Key, values: dict):
+        ...
+
+    def delete(self, key: Key):
+        ...
+
+    def clear(self, table: Optional[str] = None):
+        ...
+
+
+class LocalCache:
+    """In-process LRU of snapshots, each kept for at most `ttl` seconds"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Key, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Key) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, values = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return values
+
+    def set(self, key: Key, values: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self, table: Optional[str] = None):
+        with self._lock:
+            if table is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == table]:
+                del self._entries[key]
+
+
+def snapshot(obj) -> Optional[dict]:
+    """Column values of a loaded entity, None if some are expired or deferred"""
+    state = inspect(obj)
+    loaded = state.dict
+    values = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key not in loaded:
+            return None
+        values[attr.key] = loaded[attr.key]
+    return values
+
+
+def materialize(model, values: dict):
+    """Detached entity with `values` as its committed state, no SQL involved"""
+    obj = inspect(model).class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(obj, key, value)
+    make_transient_to_detached(obj)
+    return obj
+
+
+class EntityCache:
+    """
+    Snapshots looked up tier by tier, fastest first. A hit in a slower
+    tier is copied into the faster ones.
+    """
+
+    def __init__(self, tiers: List[CacheTier]):
+        self.tiers = tiers
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def enabled(model) -> bool:
+        return getattr(model, "__cache_entities__", False)
+
+    @staticmethod
+    def key(model, uid: Any) -> Key:
+        return model.__tablename__, str(uid)
+
+    def _lookup(self, key: Key) -> Optional[dict]:
+        for i, tier in enumerate(self.tiers):
+            values = tier.get(key)
+            if values is not None:
+                for faster in self.tiers[:i]:
+                    faster.set(key, values)
+                return values
+        return None
+
+    def get(self, model, uid: Any):
+        values = self._lookup(self.key(model, uid))
+        if values is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return materialize(model, values)
+
+    def get_many(self, model, uids: Iterable[Any]) -> Dict[Any, Any]:
+        found = {}
+        for uid in uids:
+            obj = self.get(model, uid)
+            if obj is not None:
+                found[uid] = obj
+        return found
+
+    def put(self, obj):
+        values = snapshot(obj)
+        if values is not None:
+            key = self.key(type(obj), values["uid"])
+            for tier in self.tiers:
+                tier.set(key, values)
+
+    def put_many(self, objs: Iterable[Any]):
+        for obj in objs:
+            self.put(obj)
+
+    def invalidate(self, model, uids: Iterable[Any]):
+        self.drop(model.__tablename__, uids)
+
+    def drop(self, table: str, uids: Iterable[Any]):
+        for uid in uids:
+            key = (table, str(uid))
+            for tier in self.tiers:
+                tier.delete(key)
+
+    def clear(self, table: Optional[str] = None):
+        for tier in self.tiers:
+            tier.clear(table)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "tiers": [
+                {"tier": type(tier).__name__, "entries": len(tier)}
+                for tier in self.tiers
+            ],
+        }
+
+
+def _tiers() -> List[CacheTier]:
+    tiers: List[CacheTier] = [
+        LocalCache(settings.DB_ENTITY_CACHE_TTL, settings.DB_ENTITY_CACHE_SIZE)
+    ]
+    if settings.DB_SHM_CACHE_ENABLED:
+        from .shm_cache import SharedMemoryCache
+
+        tiers.append(
+            SharedMemoryCache(
+                settings.DB_SHM_CACHE_PATH,
+                settings.DB_SHM_CACHE_SIZE_MB * 1024 * 1024,
+                settings.DB_ENTITY_CACHE_TTL,
+                slot_size=settings.DB_SHM_CACHE_SLOT_SIZE,
+            )
+        )
+    return tiers
+
+
+entity_cache = EntityCache(_tiers())
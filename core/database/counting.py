@@ -0,0 +1,102 @@
+import enum
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from sqlalchemy import text
+
+from core.config import settings
+
+from . import smart_query
+
+logger = logging.getLogger(__name__)
+
+
+class CountMode(enum.Enum):
+    EXACT = "exact"  # real count(*), a scan of every matching row
+    ESTIMATED = "estimated"  # planner statistics, free but approximate
+    CACHED = "cached"  # exact count reused for a while, dropped on writes
+
+
+class CountCache:
+    """
+    Exact counts per table and filter signature, kept for `ttl` seconds
+    or until something writes to the table.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[Tuple[str, Hashable], Tuple[float, int]]" = (
+            OrderedDict()
+        )
+
+    @staticmethod
+    def signature(filters: Any) -> Hashable:
+        shape, values = smart_query.signature(filters)
+        return shape, repr(values)
+
+    def get(self, table: str, filters: Any) -> Optional[int]:
+        key = (table, self.signature(filters))
+        entry = self._counts.get(key)
+        if entry is None:
+            return None
+        expires, count = entry
+        if expires < time.monotonic():
+            del self._counts[key]
+            return None
+        return count
+
+    def set(self, table: str, filters: Any, count: int):
+        key = (table, self.signature(filters))
+        self._counts[key] = (time.monotonic() + self.ttl, count)
+        self._counts.move_to_end(key)
+        while len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+
+    def invalidate(self, table: str):
+        for key in [k for k in self._counts if k[0] == table]:
+            del self._counts[key]
+
+    def clear(self):
+        self._counts.clear()
+
+
+count_cache = CountCache(settings.DB_COUNT_CACHE_TTL, settings.DB_COUNT_CACHE_SIZE)
+
+
+async def estimate_table(session, table) -> Optional[int]:
+    """Row count from pg_class, None when the table was never analyzed"""
+    name = f"{table.schema}.{table.name}" if table.schema else table.name
+    stmt = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)")
+    estimate = (await session.execute(stmt, {"t": name})).scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return estimate
+
+
+async def estimate_query(session, stmt) -> Optional[int]:
+    """Row estimate of the planner for `stmt`, without running it"""
+    connection = await session.connection()
+    try:
+        sql = stmt.compile(
+            dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+        )
+        # the compiled SQL may contain colons (casts, literals) that text()
+        # would take for bind parameters, hand it to the driver as is
+        async with session.begin_nested():
+            result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = result.scalar()
+    except Exception as e:
+        logger.debug(f"Cannot estimate rows, falling back to counting: {e}")
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def supports_estimates(session) -> bool:
+    connection = await session.connection()
+    return connection.dialect.name == "postgresql"
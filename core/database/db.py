@@ -1,12 +1,24 @@
+import asyncio
+import itertools
+import logging
 from asyncio import current_task
 from functools import lru_cache
 
-from sqlalchemy import create_engine
+from sqlalchemy import Delete, Insert, Update, create_engine
 from sqlalchemy.ext.asyncio import (AsyncSession, async_scoped_session,
                                     create_async_engine)
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, configure_mappers, sessionmaker
 
 from core.config import settings
+from core.uid_gen import USE_BIGINT_IDS
+
+from . import statements
+from .entity import DBModel
+from .telemetry import (InstrumentedAsyncPool, attach_telemetry,
+                        register_pool_metrics)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 
 @lru_cache(maxsize=None)
@@ -14,19 +26,69 @@ def get_sync_engine():
     return create_engine(settings.SQLALCHEMY_DATABASE_URI)
 
 
+def _create_async_engine(uri, echo, label):
+    engine = create_async_engine(
+        uri,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        connect_args={
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+        echo=echo,
+        future=True,
+    )
+    attach_telemetry(engine, label)
+    return engine
+
+
 @lru_cache(maxsize=None)
-def get_async_engine(*, echo=True):
-    return create_async_engine(
+def get_async_engine(*, echo=settings.DB_ECHO):
+    engine = _create_async_engine(
         settings.SQLALCHEMY_TEST_ASYNC_DATABASE_URI
         if settings.TESTING
         else settings.SQLALCHEMY_ASYNC_DATABASE_URI,
-        pool_pre_ping=True,
-        echo=echo,
-        future=True,
+        echo,
+        "primary",
     )
+    register_pool_metrics()
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_replica_engines():
+    return [
+        _create_async_engine(uri, settings.DB_ECHO, f"replica-{i}")
+        for i, uri in enumerate(settings.SQLALCHEMY_REPLICA_ASYNC_DATABASE_URIS)
+    ]
+
+
+@lru_cache(maxsize=None)
+def _replica_cycle():
+    return itertools.cycle(get_replica_engines())
+
+
+class RoutingSession(Session):
+    """
+    Session for read only work: each session sticks to one replica, picked
+    round robin. Flushes and DML still go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            return get_async_engine().sync_engine
+        if "replica" not in self.info:
+            self.info["replica"] = next(_replica_cycle())
+        return self.info["replica"].sync_engine
 
 
+@lru_cache(maxsize=None)
 def get_async_session():
+    """The session factory, built once per process"""
     return sessionmaker(
         bind=get_async_engine(),
         expire_on_commit=False,
@@ -35,5 +97,76 @@ def get_async_session():
     )
 
 
+@lru_cache(maxsize=None)
+def get_async_read_session():
+    """Session factory for read only repository calls"""
+    if not get_replica_engines():
+        return get_async_session()
+    return sessionmaker(
+        expire_on_commit=False,
+        autoflush=False,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+    )
+
+
+@lru_cache(maxsize=None)
 def get_async_session_scopped():
     return async_scoped_session(get_async_session(), scopefunc=current_task)
+
+
+def _warm_statements(model):
+    """Hot repository statements worth compiling before the first request"""
+    return [statements.find_by_uid(model), statements.find_by_uids(model)]
+
+
+async def _warm_connection(connection, models):
+    # a uid that never exists, executing is what fills SQLAlchemy's compiled
+    # cache and asyncpg's per-connection prepared statement cache
+    missing = -1 if USE_BIGINT_IDS else ""
+    for model in models:
+        for stmt in _warm_statements(model):
+            try:
+                await connection.execute(stmt, {"uid": missing, "uids": [missing]})
+            except Exception as e:
+                logger.warning(f"Could not warm up {model.__name__}: {e}")
+                await connection.rollback()
+    await connection.rollback()
+
+
+async def init_db(warm_connections: int = settings.DB_POOL_WARM_CONNECTIONS):
+    """
+    Pay the database start up costs before serving: configure mappers,
+    build the engine and session factory, open pooled connections and
+    compile the common statements on each of them.
+    """
+    configure_mappers()
+    models = [mapper.class_ for mapper in DBModel.registry.mappers]
+    engine = get_async_engine()
+    get_async_session()
+
+    warm_connections = min(warm_connections, engine.pool.size())
+    if warm_connections <= 0:
+        return
+    opened = await asyncio.gather(
+        *(engine.connect() for _ in range(warm_connections)), return_exceptions=True
+    )
+    connections = [c for c in opened if not isinstance(c, BaseException)]
+    errors = [c for c in opened if isinstance(c, BaseException)]
+    if errors:
+        logger.error(f"Database pool warm up failed: {errors[0]}")
+    try:
+        await asyncio.gather(*(_warm_connection(c, models) for c in connections))
+    finally:
+        await asyncio.gather(*(c.close() for c in connections))
+    logger.info(f"Database pool warmed up with {len(connections)} connections")
+
+
+async def dispose_db():
+    """Close pooled connections on shutdown"""
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    if get_replica_engines.cache_info().currsize:
+        await asyncio.gather(*(e.dispose() for e in get_replica_engines()))
+    if get_sync_engine.cache_info().currsize:
+        get_sync_engine().dispose()
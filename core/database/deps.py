@@ -2,13 +2,15 @@ from contextlib import AbstractAsyncContextManager, asynccontextmanager
 from typing import AsyncGenerator, Callable
 
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import HTTPConnection
 
 from .db import get_async_session, get_async_session_scopped
+from .uow import UnitOfWork
 
 
 @asynccontextmanager
 async def _get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with get_async_session() as session:
+    async with get_async_session()() as session:
         try:
             yield session
         except Exception:
@@ -22,6 +24,19 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_unit_of_work(
+    connection: HTTPConnection,
+) -> AsyncGenerator[UnitOfWork, None]:
+    """
+    Request scoped unit of work, shared by every repository of a request.
+    FastAPI only runs the code after `yield` once the response is sent, so
+    UnitOfWorkMiddleware completes it from the request state before that.
+    """
+    async with UnitOfWork() as uow:
+        connection.state.uow = uow
+        yield uow
+
+
 @asynccontextmanager
 async def session_scopped_context() -> Callable[
     ..., AbstractAsyncContextManager[AsyncSession]
@@ -7,7 +7,8 @@ from sqlalchemy.ext.hybrid import hybrid_method, hybrid_property
 from sqlalchemy.orm import (DeclarativeBase, Mapped, MappedAsDataclass,
                             RelationshipProperty, mapped_column)
 
-from core.uid_gen import get_flake_uid
+from core.config import settings
+from core.uid_gen import FelicityIDType, FelicitySAID, get_flake_uid
 from core.utils import classproperty
 
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +21,8 @@ class DBModel(MappedAsDataclass, DeclarativeBase):
     __repr_attrs__ = []
     __repr_max_length__ = 15
     __mapper_args__ = {"eager_defaults": True}
+    __cache_entities__ = False  # serve uid lookups from core.database.cache
+    __cache_results__ = False  # cache query results, core.database.result_cache
 
     @classproperty
     def columns(cls):
@@ -123,8 +126,8 @@ class DBModel(MappedAsDataclass, DeclarativeBase):
 
         return self
 
-    uid: Mapped[str] = mapped_column(
-        init=False, default_factory=get_flake_uid, primary_key=True
+    uid: Mapped[FelicityIDType] = mapped_column(
+        FelicitySAID, init=False, default_factory=get_flake_uid, primary_key=True
     )
 
     created_at: Mapped[datetime] = mapped_column(
@@ -132,7 +135,7 @@ class DBModel(MappedAsDataclass, DeclarativeBase):
         insert_default=lambda: datetime.now(pytz.utc),
         default=None,
         init=False,
-        index=True,
+        index=settings.DB_INDEX_CREATED_AT,
     )
 
     def to_dict(self, nested=False, hybrid_attributes=False, exclude=None):
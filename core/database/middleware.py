@@ -0,0 +1,58 @@
+import logging
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWorkMiddleware:
+    """
+    Completes the request's unit of work (see deps.get_unit_of_work) when
+    the response starts, before anything reaches the client: a success
+    response commits and an error response rolls back. A failed commit
+    turns the response into a 500 instead of a success the client would
+    wrongly rely on.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        failed = False
+
+        async def complete_then_send(message: Message):
+            nonlocal failed
+            if failed:
+                return  # the app's own response is replaced
+            if message["type"] == "http.response.start":
+                uow = scope.get("state", {}).get("uow")
+                if uow is not None:
+                    try:
+                        await uow.complete(commit=message["status"] < 400)
+                    except Exception:
+                        logger.exception("Failed to commit the unit of work")
+                        failed = True
+                        await _server_error(send)
+                        return
+            await send(message)
+
+        await self.app(scope, receive, complete_then_send)
+
+
+async def _server_error(send: Send):
+    body = b"Internal Server Error"
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 500,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
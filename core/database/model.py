@@ -1,9 +1,14 @@
 from pydantic import BaseModel
 
+from core.uid_gen import FelicityIDType, FelicityIntID
+
 
 class CoreModel(BaseModel):
     pass
 
 
 class IDModelMixin(BaseModel):
-    uid: str
+    uid: FelicityIDType
+
+    class Config:
+        json_encoders = {FelicityIntID: str}
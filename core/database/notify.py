@@ -0,0 +1,166 @@
+"""
+Change notifications between workers through Postgres LISTEN/NOTIFY.
+
+Repositories publish `origin|table|uid,uid,...` on the writing
+transaction with pg_notify. Postgres only delivers notifications when
+that transaction commits, and drops them on rollback. Every worker keeps
+one dedicated connection listening on the channel. It fans the events
+out to the local caches, its own included: they close the window in
+which a concurrent request could re-cache a row before the commit.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Callable, Iterable, List, Optional
+
+import asyncpg
+from sqlalchemy import text
+
+from core.config import settings
+
+from .cache import entity_cache
+from .counting import count_cache
+from .result_cache import result_cache
+
+logger = logging.getLogger(__name__)
+
+# identifies the publishing worker when debugging notifications
+ORIGIN = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+# NOTIFY payloads must stay under 8000 bytes
+MAX_PAYLOAD = 7900
+
+Subscriber = Callable[[str, List[str]], Any]
+
+
+def _payloads(table: str, uids: Iterable[Any]) -> List[str]:
+    head = f"{ORIGIN}|{table}|"
+    payloads, batch, size = [], [], len(head)
+    for uid in map(str, uids):
+        if batch and size + len(uid) + 1 > MAX_PAYLOAD:
+            payloads.append(head + ",".join(batch))
+            batch, size = [], len(head)
+        batch.append(uid)
+        size += len(uid) + 1
+    payloads.append(head + ",".join(batch))
+    return payloads
+
+
+async def publish(session, table: str, uids: Iterable[Any] = ()):
+    """
+    Announce writes to `table`, sent when the session's transaction
+    commits. No uids means rows were only added.
+    """
+    if not settings.DB_NOTIFY_ENABLED:
+        return
+    connection = await session.connection()
+    if connection.dialect.name != "postgresql":
+        return
+    stmt = text("SELECT pg_notify(:channel, :payload)")
+    for payload in _payloads(table, uids):
+        await session.execute(
+            stmt, {"channel": settings.DB_NOTIFY_CHANNEL, "payload": payload}
+        )
+
+
+class ChangeListener:
+    """
+    Dedicated LISTEN connection, reconnected with backoff when it drops.
+    Notifications missed while disconnected cannot be replayed, so the
+    subscribers are told to drop everything (`table` "*") on reconnect.
+    """
+
+    def __init__(self, dsn: str, channel: str):
+        self.dsn = dsn
+        self.channel = channel
+        self.subscribers: List[Subscriber] = []
+        self._task: Optional[asyncio.Task] = None
+        self._lost: Optional[asyncio.Event] = None
+
+    def subscribe(self, subscriber: Subscriber):
+        self.subscribers.append(subscriber)
+
+    def _dispatch(self, table: str, uids: List[str]):
+        for subscriber in self.subscribers:
+            try:
+                subscriber(table, uids)
+            except Exception as e:
+                logger.warning(f"Change subscriber failed: {e}")
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        try:
+            origin, table, uids = payload.split("|", 2)
+        except ValueError:
+            logger.warning(f"Malformed change notification: {payload!r}")
+            return
+        self._dispatch(table, uids.split(",") if uids else [])
+
+    async def _listen(self):
+        connection = await asyncpg.connect(self.dsn)
+        self._lost = asyncio.Event()
+        connection.add_termination_listener(lambda c: self._lost.set())
+        try:
+            await connection.add_listener(self.channel, self._on_notify)
+            logger.info(f"Listening for changes on '{self.channel}'")
+            await self._lost.wait()
+        finally:
+            if not connection.is_closed():
+                await connection.close()
+
+    async def _run(self):
+        delay = 1
+        connected_before = False
+        while True:
+            try:
+                if connected_before:
+                    self._dispatch("*", [])
+                connected_before = True
+                await self._listen()
+                delay = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Change listener lost ({e}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def invalidate_local_caches(table: str, uids: List[str]):
+    if table == "*":
+        entity_cache.clear()
+        count_cache.clear()
+        result_cache.clear()
+        return
+    count_cache.invalidate(table)
+    result_cache.bump(table)
+    if uids:
+        entity_cache.drop(table, uids)
+
+
+listener = ChangeListener(
+    str(settings.SQLALCHEMY_DATABASE_URI), settings.DB_NOTIFY_CHANNEL
+)
+listener.subscribe(invalidate_local_caches)
+
+
+async def start_change_listener():
+    if settings.DB_NOTIFY_ENABLED:
+        listener.start()
+
+
+async def stop_change_listener():
+    await listener.stop()
@@ -0,0 +1,161 @@
+"""
+Keyset (seek) pagination: pages are found by comparing the sort key
+with the one carried by the cursor instead of skipping OFFSET rows, so a
+deep page costs the same as the first one.
+
+Cursors are the page boundary's sort key values, base64 encoded and
+signed with the SECRET_KEY so that clients cannot forge them.
+"""
+import base64
+import hashlib
+import hmac
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, bindparam, or_, tuple_
+
+from core.config import settings
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class PageInfo:
+    start_cursor: Optional[str] = None
+    end_cursor: Optional[str] = None
+    has_next_page: bool = False
+    has_previous_page: bool = False
+
+
+@dataclass
+class EdgeNode:
+    cursor: str
+    node: Any
+
+
+@dataclass
+class PageCursor:
+    edges: List[EdgeNode] = field(default_factory=list)
+    items: List[Any] = field(default_factory=list)
+    page_info: PageInfo = field(default_factory=PageInfo)
+    total_count: Optional[int] = None  # only counted when asked for
+
+
+@dataclass
+class SortKey:
+    name: str
+    column: Any
+    descending: bool = False
+
+
+def sort_keys(model, sort_by: Optional[Sequence[str]] = None) -> List[SortKey]:
+    """
+    Parse `["-created_at", "name"]` style sort attributes and append the
+    uid as tiebreaker so that every row has a unique position. Sort
+    columns should be NOT NULL, NULLs cannot be compared against.
+    """
+    keys = []
+    for attr in sort_by or []:
+        name = attr.lstrip("-")
+        keys.append(SortKey(name, getattr(model, name), attr.startswith("-")))
+        if name == "uid":
+            # unique already, later attributes could never break a tie
+            return keys
+    descending = keys[-1].descending if keys else False
+    keys.append(SortKey("uid", model.uid, descending))
+    return keys
+
+
+def order_by(keys: List[SortKey], backward: bool = False):
+    return [
+        k.column.asc() if k.descending == backward else k.column.desc() for k in keys
+    ]
+
+
+def seek(keys: List[SortKey], values: Sequence[Any], backward: bool = False):
+    """Rows strictly after (or before when `backward`) the given sort key"""
+    bound = [
+        bindparam(None, value, type_=key.column.type)
+        for key, value in zip(keys, values)
+    ]
+
+    def beyond(key, value):
+        after = key.descending == backward
+        return key.column > value if after else key.column < value
+
+    if len({k.descending for k in keys}) == 1:
+        # uniform direction: a row value comparison the index can serve
+        columns = tuple_(*(k.column for k in keys))
+        after = keys[0].descending == backward
+        return columns > tuple_(*bound) if after else columns < tuple_(*bound)
+
+    criteria = []
+    for i, key in enumerate(keys):
+        equal = [k.column == v for k, v in zip(keys[:i], bound[:i])]
+        criteria.append(and_(*equal, beyond(key, bound[i])))
+    return or_(*criteria)
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    raise TypeError(f"Cannot put {type(value).__name__} in a cursor")
+
+
+def _object_hook(obj):
+    if "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    if "$d" in obj:
+        return date.fromisoformat(obj["$d"])
+    if "$dec" in obj:
+        return Decimal(obj["$dec"])
+    return obj
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(keys: List[SortKey], payload: bytes) -> bytes:
+    # the sort spec is signed too, a cursor is only valid for its ordering
+    spec = ",".join(("-" if k.descending else "") + k.name for k in keys)
+    message = spec.encode() + b"|" + payload
+    key = settings.SECRET_KEY.encode()
+    return hmac.new(key, message, hashlib.sha256).digest()[:16]
+
+
+def encode_cursor(keys: List[SortKey], values: Sequence[Any]) -> str:
+    payload = json.dumps(list(values), default=_default, separators=(",", ":"))
+    raw = payload.encode()
+    return f"{_b64encode(raw)}.{_b64encode(_signature(keys, raw))}"
+
+
+def decode_cursor(keys: List[SortKey], cursor: str) -> Tuple[Any, ...]:
+    try:
+        payload, signature = cursor.split(".")
+        raw, signature = _b64decode(payload), _b64decode(signature)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if not hmac.compare_digest(signature, _signature(keys, raw)):
+        raise InvalidCursor("Cursor signature mismatch")
+    values = json.loads(raw, object_hook=_object_hook)
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise InvalidCursor("Cursor does not match the sort order")
+    return tuple(values)
+
+
+def item_cursor(keys: List[SortKey], item: Any) -> str:
+    return encode_cursor(keys, [getattr(item, k.name) for k in keys])
@@ -1,5 +1,7 @@
 from typing import Any, AsyncIterator, Dict, List, Optional, Protocol
 
+from core.uid_gen import FelicityIDType
+
 
 class AsyncSessionProtocol(Protocol):
     async def refresh(self, instance, attribute_names=None, with_for_update=None):
@@ -89,7 +91,7 @@ class AsyncSessionProtocol(Protocol):
 
 
 class ModelProtocol(Protocol):
-    uid: str
+    uid: FelicityIDType
 
     def fill(self, **kwargs):
         ...
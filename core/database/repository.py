@@ -1,11 +1,31 @@
 from abc import ABC
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable, List, Optional, Tuple
 
+from sqlalchemy import and_, func, inspect, or_, select
+
+from core.config import settings
+from core.uid_gen import USE_BIGINT_IDS, uid_bounds
+
+from . import bulk, notify, pagination, statements
+from .cache import EntityCache, entity_cache, materialize, snapshot
+from .counting import (CountMode, count_cache, estimate_query, estimate_table,
+                       supports_estimates)
 from .protocols import AsyncSessionProtocol, ModelProtocol
+from .result_cache import result_cache
+from .single_flight import single_flight, statement_key
+from .smart_query import smart_count, smart_query
+from .uow import UnitOfWork
 
 
 class BaseRepository(ABC):
     session_factory: AsyncSessionProtocol
+    read_session_factory: Optional[AsyncSessionProtocol] = None
+    uow: Optional[UnitOfWork] = None
     model: ModelProtocol
+    cache: EntityCache = entity_cache
+    _has_written = False
 
     @property
     def query(self):
@@ -19,49 +39,563 @@ class BaseRepository(ABC):
         return data
 
     def _fill(self, **kwargs):
-        return self.model.fill(**kwargs)
-
-    async def from_query(query):
+        return self.model().fill(**kwargs)
+
+    @asynccontextmanager
+    async def _session(self):
+        """
+        Session for writes: the unit of work's when there is one, else a
+        session of our own.
+        """
+        self._invalidate()
+        if self.uow is not None:
+            self.uow.wrote(self.model.__tablename__)
+            async with self.uow.session() as session:
+                yield session
+            return
+        self._has_written = True
         async with self.session_factory() as session:
-            results = await session.execute(query)
-        return results.unique().scalars().all()
+            yield session
+
+    async def _publish(self, session, uids: List[Any] = ()):
+        """Tell the other workers about the write once it is committed"""
+        await notify.publish(session, self.model.__tablename__, uids)
+
+    async def _commit(self, session):
+        if self.uow is not None:
+            # the unit of work commits once, when the request is done
+            await session.flush()
+        else:
+            await session.commit()
+            # reads racing the write may have cached the old rows meanwhile
+            self._invalidate()
+
+    def _invalidate(self):
+        """Make cached counts and query results of the model's table stale"""
+        count_cache.invalidate(self.model.__tablename__)
+        result_cache.bump(self.model.__tablename__)
+
+    @asynccontextmanager
+    async def _read_session(self):
+        """
+        Session for read only calls, served by the replicas when they are
+        configured. Once this repository has written, reads stay on the
+        primary so that callers always see their own writes.
+        """
+        if self.uow is not None:
+            async with self.uow.read_session() as session:
+                yield session
+            return
+        factory = self.session_factory
+        if self.read_session_factory is not None and not self._has_written:
+            factory = self.read_session_factory
+        async with factory() as session:
+            yield session
+
+    @asynccontextmanager
+    async def _stream_session(self):
+        """
+        Session of our own for streaming. Sharing the unit of work's would
+        lock it for as long as the consumer keeps iterating; the stream
+        does not see writes the unit of work has not committed yet.
+        """
+        factory = self.session_factory
+        if self.uow is not None:
+            factory = self.uow.read_session_factory
+            if self._written:
+                factory = self.uow.session_factory
+        elif self.read_session_factory is not None and not self._written:
+            factory = self.read_session_factory
+        async with factory() as session:
+            yield session
+
+    async def stream_chunks(
+        self,
+        query=None,
+        params: Optional[dict] = None,
+        fetch_size: int = settings.DB_STREAM_FETCH_SIZE,
+    ) -> AsyncIterator[List[Any]]:
+        """
+        Entities of `query` (all of them by default) in lists of up to
+        `fetch_size`, read through a server side cursor. The next batch is
+        only fetched when the consumer asks for it and the connection is
+        held until the iteration ends, so wrap early exits in
+        `contextlib.aclosing`.
+        """
+        if query is None:
+            query = self.query.order_by(self.model.uid)
+        query = query.execution_options(yield_per=fetch_size)
+        async with self._stream_session() as session:
+            results = await session.stream_scalars(query, params)
+            async for partition in results.partitions():
+                yield partition
+
+    async def stream(
+        self,
+        query=None,
+        params: Optional[dict] = None,
+        fetch_size: int = settings.DB_STREAM_FETCH_SIZE,
+    ) -> AsyncIterator[Any]:
+        async for chunk in self.stream_chunks(query, params, fetch_size):
+            for item in chunk:
+                yield item
+
+    def stream_all(
+        self, fetch_size: int = settings.DB_STREAM_FETCH_SIZE
+    ) -> AsyncIterator[Any]:
+        return self.stream(fetch_size=fetch_size)
+
+    def stream_by_uids(
+        self, uids: List[Any], fetch_size: int = settings.DB_STREAM_FETCH_SIZE
+    ) -> AsyncIterator[Any]:
+        stmt = statements.find_by_uids(self.model)
+        return self.stream(stmt, {"uids": list(uids)}, fetch_size)
+
+    @property
+    def _written(self) -> bool:
+        """Whether this repository, or its unit of work, has written"""
+        return self._has_written or (self.uow is not None and self.uow.dirty)
+
+    async def from_query(self, query, params: Optional[dict] = None):
+        key = statement_key(query, params)
+
+        async def load():
+            async with self._read_session() as session:
+                results = await session.execute(query, params)
+                return results.unique().scalars().all()
+
+        if key is None or self._written or not result_cache.enabled(self.model):
+            return await self._single_flight(key, load)
+        cached = result_cache.get(key)
+        if cached is not None:
+            return await self._adopt(cached)
+
+        async def load_and_cache():
+            # versions taken before the query make results raced by a write
+            # stale; only the caller running the query caches them
+            versions = result_cache.versions(result_cache.tables(query, key))
+            items = await load()
+            result_cache.set(key, versions, items)
+            return items
+
+        return await self._single_flight(key, load_and_cache)
+
+    async def _single_flight(self, key, load):
+        """
+        Run `load` once for all identical concurrent reads in this worker.
+        The caller running it snapshots the entities before handing them
+        out and every caller, that one included, gets its own copies.
+        Entities that cannot be copied are not shared, the other callers
+        load their own. Reads that must see this repository's own writes
+        are never shared.
+        """
+        if key is None or self._written or not settings.DB_SINGLE_FLIGHT:
+            return await load()
+        loaded = []
+
+        async def load_frozen():
+            result = await load()
+            loaded.append(result)
+            return self._freeze(result)
+
+        frozen, shared = await single_flight.do(key, load_frozen)
+        if frozen is not None:
+            return await self._thaw(frozen)
+        return await load() if shared else loaded[0]
+
+    @staticmethod
+    def _freeze(result) -> Optional[Tuple[bool, list]]:
+        """
+        Column values of the entities in `result`, plain values as they
+        are. None when an entity has expired or deferred columns, or
+        loaded relationships, which a copy would not carry.
+        """
+        many = isinstance(result, list)
+        rows = []
+        for item in result if many else [result]:
+            if not hasattr(item, "_sa_instance_state"):
+                rows.append((None, item))
+                continue
+            values = snapshot(item)
+            state = inspect(item)
+            if values is None or any(
+                rel.key in state.dict for rel in state.mapper.relationships
+            ):
+                return None
+            rows.append((type(item), values))
+        return many, rows
+
+    async def _thaw(self, frozen: Tuple[bool, list]):
+        """Copies of frozen entities, attached to the unit of work"""
+        many, rows = frozen
+        items = [
+            value if model is None else materialize(model, value)
+            for model, value in rows
+        ]
+        if all(model is not None for model, _ in rows):
+            items = await self._adopt(items)
+        return items if many else items[0]
+
+    def _use_cache(self) -> bool:
+        """
+        Whether uid lookups go through the entity cache. A unit of work
+        that wrote must read its own uncommitted state from the database.
+        """
+        if not self.cache.enabled(self.model):
+            return False
+        return self.uow is None or not self.uow.dirty
+
+    async def _adopt(self, items: List[Any]) -> List[Any]:
+        """Attach cached (detached) entities to the unit of work's session"""
+        if self.uow is None or not items:
+            return items
+        async with self.uow.read_session() as session:
+            return [await session.merge(item, load=False) for item in items]
+
+    async def _take_over(self, items: List[Any]):
+        """
+        Entities found through the unit of work's replica session, cache
+        hits included, belong to it; detach them before the write session
+        adds them.
+        """
+        if self.uow is not None:
+            await self.uow.release(items)
+
+    def _refresh_cache(self, items: List[Any], deleted: bool = False):
+        """Keep cached entities in step with a write"""
+        if not self.cache.enabled(self.model):
+            return
+        if deleted or self.uow is not None:
+            # not committed until the unit of work is
+            self.cache.invalidate(self.model, [item.uid for item in items])
+        else:
+            self.cache.put_many(items)
+
+    async def find(self, uid):
+        use_cache = self._use_cache()
+        if use_cache:
+            cached = self.cache.get(self.model, uid)
+            if cached is not None:
+                return (await self._adopt([cached]))[0]
+
+        async def load():
+            stmt = statements.find_by_uid(self.model)
+            async with self._read_session() as session:
+                results = await session.execute(stmt, {"uid": uid})
+                return results.scalars().one_or_none()
+
+        key = ("find", self.model.__tablename__, str(uid))
+        result = await self._single_flight(key, load)
+        if use_cache and result is not None:
+            self.cache.put(result)
+        return result
+
+    async def find_or_fail(self, uid):
+        result = await self.find(uid)
+        if result:
+            return result
+        else:
+            raise ValueError(f"{self.model.__name__} with uid '{uid}' was not found")
+
+    async def first_where(self, **kwargs):
+        """Return the first value in database based on given args.
+        Example:
+            repository.first_where(uid=5, created_at__gte=since)
+        """
+        stmt, params = smart_query(self.model, kwargs, limit=1)
+        async with self._read_session() as session:
+            results = await session.execute(stmt, params)
+            return results.scalars().first()
+
+    async def all(self):
+        return await self.from_query(self.query)
+
+    async def all_where(self, **kwargs):
+        return await self.from_query(*smart_query(self.model, kwargs))
+
+    async def filter(self, filters: Any = None, sort_attrs: Optional[List[str]] = None):
+        """Entities matching smart_query `filters`, see core.database.smart_query"""
+        return await self.from_query(*smart_query(self.model, filters, sort_attrs))
+
+    async def get_by_uids(self, uids: List[Any]):
+        uids = list(uids)
+        if not self._use_cache():
+            stmt = statements.find_by_uids(self.model)
+            return await self.from_query(stmt, {"uids": uids})
+
+        cached = self.cache.get_many(self.model, uids)
+        items = await self._adopt(list(cached.values()))
+        missing = [uid for uid in uids if uid not in cached]
+        if missing:
+            stmt = statements.find_by_uids(self.model)
+            loaded = await self.from_query(stmt, {"uids": missing})
+            self.cache.put_many(loaded)
+            items.extend(loaded)
+        return sorted(items, key=lambda item: item.uid)
+
+    async def count_where(
+        self, filters: Any = None, mode: CountMode = CountMode.EXACT
+    ) -> int:
+        """
+        Number of entities matching `filters`. ESTIMATED answers from the
+        planner's statistics and CACHED reuses a recent exact count; both
+        fall back to counting when they cannot answer.
+        """
+        filters = filters or {}
+        if mode == CountMode.ESTIMATED:
+            estimate = await self._estimate_count(filters)
+            if estimate is not None:
+                return estimate
+        # counts seen inside a unit of work may include uncommitted writes
+        cacheable = mode == CountMode.CACHED and not (self.uow and self.uow.dirty)
+        table = self.model.__tablename__
+        if cacheable:
+            count = count_cache.get(table, filters)
+            if count is not None:
+                return count
+
+        stmt, params = smart_count(self.model, filters)
+
+        async def load():
+            async with self._read_session() as session:
+                results = await session.execute(stmt, params)
+                return results.scalar_one()
+
+        count = await self._single_flight(statement_key(stmt, params), load)
+        if cacheable:
+            count_cache.set(table, filters, count)
+        return count
+
+    async def _estimate_count(self, filters: Any) -> Optional[int]:
+        async with self._read_session() as session:
+            if not await supports_estimates(session):
+                return None
+            if filters:
+                stmt, params = smart_query(self.model, filters)
+                return await estimate_query(session, stmt.params(params))
+            return await estimate_table(session, self.model.__table__)
+
+    def uid_between(self, start: datetime, end: datetime):
+        """
+        Criterion matching entities whose uid was generated between start
+        and end. Snowflake uids lead with their creation time, so this is
+        a primary key range scan rather than a created_at index lookup.
+        """
+        lo, hi = uid_bounds(start, end)
+        uid = self.model.uid
+        if USE_BIGINT_IDS:
+            return uid.between(lo, hi)
+        # digit strings of equal length sort like the numbers they hold, so
+        # the range becomes one index range per digit count
+        ranges = []
+        for digits in range(len(str(lo)), len(str(hi)) + 1):
+            first = str(max(lo, 10 ** (digits - 1)))
+            last = str(min(hi, 10**digits - 1))
+            ranges.append(and_(func.length(uid) == digits, uid.between(first, last)))
+        return or_(*ranges)
+
+    async def created_between(self, start: datetime, end: datetime):
+        """Entities created between start and end, oldest first"""
+        stmt = self.query.where(self.uid_between(start, end))
+        return await self.from_query(stmt.order_by(self.model.uid))
 
     async def save(self, obj):
         """Saves the updated model to the current entity db."""
-        async with self.session_factory() as session:
+        await self._take_over([obj])
+        async with self._session() as session:
             try:
                 session.add(obj)
                 await session.flush()
-                await session.commit()
+                await self._publish(session, [obj.uid])
+                await self._commit(session)
             except Exception:
                 await session.rollback()
                 raise
+        self._refresh_cache([obj])
         return obj
 
+    async def save_all(self, items):
+        await self._take_over(items)
+        async with self._session() as session:
+            try:
+                session.add_all(items)
+                await session.flush()
+                await self._publish(session, [item.uid for item in items])
+                await self._commit(session)
+            except Exception:
+                await session.rollback()
+                raise
+        self._refresh_cache(items)
+        return items
+
+    async def update(self, obj, **kwargs):
+        return await self.save(obj.fill(**kwargs))
+
+    async def delete(self, obj):
+        await self._take_over([obj])
+        async with self._session() as session:
+            try:
+                await session.delete(obj)
+                await session.flush()
+                await self._publish(session, [obj.uid])
+                await self._commit(session)
+            except Exception:
+                await session.rollback()
+                raise
+        self._refresh_cache([obj], deleted=True)
+
+    async def paginate_with_cursors(
+        self,
+        page_size: int = 20,
+        after_cursor: Optional[str] = None,
+        before_cursor: Optional[str] = None,
+        filters: Any = None,
+        sort_by: Optional[List[str]] = None,
+        count_mode: Optional[CountMode] = None,
+    ) -> pagination.PageCursor:
+        """
+        Keyset paginated entities, sorted by `sort_by` (e.g. ["-created_at"])
+        with the uid as tiebreaker. Pages after `after_cursor`, or before
+        `before_cursor`, are found with an index seek. The total is
+        another query, so it is only counted when a `count_mode` is given.
+        """
+        keys = pagination.sort_keys(self.model, sort_by)
+        backward = before_cursor is not None
+        cursor = before_cursor if backward else after_cursor
+
+        stmt, params = smart_query(self.model, filters)
+        if cursor:
+            values = pagination.decode_cursor(keys, cursor)
+            stmt = stmt.where(pagination.seek(keys, values, backward))
+        # one row more than asked for tells whether there is another page
+        stmt = stmt.order_by(*pagination.order_by(keys, backward))
+        items = list(await self.from_query(stmt.limit(page_size + 1), params))
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        if backward:
+            items.reverse()
+
+        edges = self.build_edges(keys, items)
+        page_info = pagination.PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_next_page=bool(before_cursor) if backward else has_more,
+            has_previous_page=has_more if backward else bool(after_cursor),
+        )
+        total_count = None
+        if count_mode is not None:
+            total_count = await self.count_where(filters, count_mode)
+        return pagination.PageCursor(
+            edges=edges, items=items, page_info=page_info, total_count=total_count
+        )
+
+    def build_edges(self, keys, items: List[Any]) -> List[pagination.EdgeNode]:
+        return [
+            pagination.EdgeNode(cursor=pagination.item_cursor(keys, item), node=item)
+            for item in items
+        ]
+
+    async def bulk_insert(
+        self,
+        rows: Iterable[Any],
+        chunk_size: int = settings.DB_BULK_CHUNK_SIZE,
+        use_copy: bool = True,
+    ) -> bulk.BulkResult:
+        """
+        Insert plain rows (dicts or schemas) without building entities.
+
+        Rows go in with COPY on asyncpg, else with a multi row insert, one
+        savepoint per chunk: a failing chunk is rolled back and reported
+        in the result while the other chunks are kept.
+        """
+        table = self.model.__table__
+        columns, records = await bulk.bulk_records(
+            table, [self._import(r) for r in rows]
+        )
+        uid_at = columns.index("uid")
+        result = bulk.BulkResult()
+        async with self._session() as session:
+            write = bulk.insert_records
+            if use_copy and await bulk.supports_copy(session):
+                write = bulk.copy_records
+            for index, offset in enumerate(range(0, len(records), chunk_size)):
+                chunk = records[offset : offset + chunk_size]
+                try:
+                    async with session.begin_nested():
+                        await write(session, table, columns, chunk)
+                except Exception as e:
+                    result.failures.append(
+                        bulk.ChunkFailure(index, offset, len(chunk), repr(e))
+                    )
+                    continue
+                result.inserted += len(chunk)
+                result.uids.extend(record[uid_at] for record in chunk)
+            if result.inserted:
+                await self._publish(session)
+            await self._commit(session)
+        return result
+
+    async def bulk_upsert(
+        self,
+        rows: Iterable[Any],
+        conflict_cols: List[str],
+        update_cols: Optional[List[str]] = None,
+        returning: bool = False,
+        chunk_size: int = settings.DB_BULK_CHUNK_SIZE,
+    ) -> List[Any]:
+        """
+        INSERT ... ON CONFLICT (conflict_cols) DO UPDATE, one statement per
+        chunk. `update_cols` defaults to every given column but the uid and
+        the conflict columns. Returns the affected uids, or the entities
+        when `returning` is set.
+        """
+        table = self.model.__table__
+        rows = [self._import(r) for r in rows]
+        if update_cols is None:
+            given = {name for row in rows for name in row}
+            skip = {"uid", *conflict_cols}
+            update_cols = [c.name for c in table.columns if c.name in given - skip]
+        columns, records = await bulk.bulk_records(table, rows)
+        records = bulk.dedupe(columns, records, conflict_cols)
+        # a statement takes at most 32767 bind parameters
+        chunk_size = max(1, min(chunk_size, 32767 // len(columns)))
+
+        affected: List[Any] = []
+        async with self._session() as session:
+            try:
+                for offset in range(0, len(records), chunk_size):
+                    values = [
+                        dict(zip(columns, r))
+                        for r in records[offset : offset + chunk_size]
+                    ]
+                    stmt = bulk.upsert_statement(
+                        self.model, values, conflict_cols, update_cols
+                    )
+                    if returning:
+                        stmt = stmt.returning(self.model).execution_options(
+                            populate_existing=True
+                        )
+                    else:
+                        stmt = stmt.returning(self.model.uid)
+                    results = await session.execute(stmt)
+                    affected.extend(results.scalars().all())
+                uids = [item.uid for item in affected] if returning else affected
+                await self._publish(session, uids)
+                await self._commit(session)
+            except Exception:
+                await session.rollback()
+                raise
+        if self.cache.enabled(self.model):
+            self.cache.invalidate(self.model, uids)
+        return affected
+
     async def create(self, **kwargs):
         item = self._fill(**kwargs)
-        created = await self.save(session, item)
+        created = await self.save(item)
         if created:
             created = await self.find(uid=created.uid)
         return created
 
-    # async def save_all(self, items):
-    #     async with self.session_factory() as session:
-    #         try:
-    #             session.add_all(items)
-    #             await session.flush()
-    #             await session.commit()
-    #         except Exception:
-    #             await session.rollback()
-    #             raise
-    #     return items
-
-    # async def delete(self, obj):
-    #     async with self.session_factory() as session:
-    #         await session.delete(obj)
-    #         await session.flush()
-    #         await session.commit()
-
     # async def destroy(self, *ids):
     #     for uid in ids:
     #         obj = await self.find(uid)
@@ -71,45 +605,6 @@ class BaseRepository(ABC):
     #     async with self.session_factory() as session:
     #         await session.flush()
 
-    # async def find(self, uid):
-    #     stmt = self.query.where(self.model.uid == uid)
-    #     async with self.session_factory() as session:
-    #         results = await session.execute(stmt)
-    #     one_or_none = results.scalars().one_or_none()
-    #     return one_or_none
-
-    # async def first_where(cls, **kwargs):
-    #     """Return the first value in database based on given args.
-    #     Example:
-    #         User.get(uid=5)
-    #     """
-    #     stmt = self.query.where(**kwargs)
-    #     async with self.session_factory() as session:
-    #         results = await session.execute(stmt)
-    #     found = results.scalars().first()
-    #     return found
-
-    # async def all(self):
-    #     async with self.session_factory() as session:
-    #         result = await session.execute(self.query)
-    #     _all = result.scalars().all()
-    #     return _all
-
-    # async def all_where(self, **kwargs):
-    #     stmt = self.where(**kwargs)
-    #     async with self.session_factory() as session:
-    #         results = await session.execute(stmt)
-    #     return results.unique().scalars().all()
-
-    # async def find_or_fail(self, uid):
-    #     result = await self.find(uid)
-    #     if result:
-    #         return result
-    #     else:
-    #         raise ValueError(
-    #             "{self.model.__name__} with uid '{uid}' was not found"
-    #         )
-
     # async def bulk_create(self, items: List):
     #     """
     #     @param items a list of Pydantic models
@@ -119,16 +614,6 @@ class BaseRepository(ABC):
     #         to_save.append(self._fill(**self._import(data)))
     #     return await cls.save_all(to_save)
 
-    # async def update(self, **kwargs):
-    #     """Returns a new get instance of the class
-    #     This is so that mutations can work well and prevent async IO issues
-    #     """
-    #     fill = self._fill(**kwargs)
-    #     updated = await self.save(fill)
-    #     if updated:
-    #         updated = await self.find(uid=updated.uid)
-    #     return updated
-
     # async def bulk_update_where(self, update_data: List, filters: Dict):
     #     """
     #     @param update_data a List of dictionary update values.
@@ -218,19 +703,6 @@ class BaseRepository(ABC):
 
     #     return found
 
-    # async def count_where(self, filters):
-    #     """
-    #     :param filters:
-    #     :return: int
-    #     """
-    #     filter_stmt = smart_query(query=self.query, filters=filters)
-    #     count_stmt = select(func.count(filter_stmt.c.uid)
-    #                         ).select_from(filter_stmt)
-    #     async with self.session_factory() as session:
-    #         res = await session.execute(count_stmt)
-    #     count = res.scalars().one()
-    #     return count
-
     # @classmethod
     # async def fulltext_search(cls, search_string, field):
     #     """Full-text Search with PostgreSQL"""
@@ -244,142 +716,25 @@ class BaseRepository(ABC):
     #     search = results.scalars().all()
     #     return search
 
-    # @classmethod
-    # async def get_by_uids(cls, uids: List[Any]):
-
-    #     stmt = select(cls).where(cls.uid.in_(uids))  # type: ignore
-
-    #     async with self.session_factory() as session:
-    #         results = await session.execute(stmt.order_by(cls.uid))
-
-    #     return results.scalars().all()
-
-    # @classmethod
-    # async def stream_by_uids(cls, uids: List[Any]) -> AsyncIterator[Any]:
-
-    #     stmt = select(cls).where(cls.uid.in_(uids))  # type: ignore
-
-    #     async with self.session_factory() as session:
-    #         stream = await session.stream(stmt.order_by(cls.uid))
-    #     async for row in stream:
-    #         yield row
-
-    # @classmethod
-    # async def stream_all(cls) -> AsyncIterator[Any]:
-    #     stmt = select(cls)
-    #     async with self.session_factory() as session:
-    #         stream = await session.stream(stmt.order_by(cls.uid))
-    #     async for row in stream:
-    #         yield row
-
-    # # https://engage.so/blog/a-deep-dive-into-offset-and-cursor-based-pagination-in-mongodb/
-    # # https://medium.com/swlh/how-to-implement-cursor-pagination-like-a-pro-513140b65f32
-
-    # @classmethod
-    # async def paginate_with_cursors(
-    #     cls,
-    #     page_size: int = None,
-    #     after_cursor: Any = None,
-    #     before_cursor: Any = None,
-    #     filters: Any = None,
-    #     sort_by: List[str] = None,
-    #     get_related: str = None,
-    # ) -> PageCursor:
-    #     if not filters:
-    #         filters = {}
-
-    #     # get total count without paging filters from cursors
-    #     total_count: int = await cls.count_where(filters=filters)
-    #     total_count = total_count if total_count else 0
-
-    #     cursor_limit = {}
-    #     if has_value_or_is_truthy(after_cursor):
-    #         cursor_limit = {"uid__gt": cls.decode_cursor(after_cursor)}
-
-    #     if has_value_or_is_truthy(before_cursor):
-    #         cursor_limit = {"uid__lt": cls.decode_cursor(before_cursor)}
-
-    #     # add paging filters
-    #     _filters = None
-    #     if isinstance(filters, dict):
-    #         _filters = [{sa_or_: cursor_limit},
-    #                     filters] if cursor_limit else filters
-    #     elif isinstance(filters, list):
-    #         _filters = filters
-    #         if cursor_limit:
-    #             _filters.append({sa_or_: cursor_limit})
-
-    #     stmt = cls.smart_query(filters=_filters, sort_attrs=sort_by)
-
-    #     if get_related:
-    #         stmt = stmt.options(selectinload(get_related))
-
-    #     if page_size:
-    #         stmt = stmt.limit(page_size)
-
-    #     async with self.session_factory() as session:
-    #         res = await session.execute(stmt)
-
-    #     qs = res.scalars().all()
-
-    #     if qs is not None:
-    #         # items = qs[:page_size]
-    #         items = qs
-    #     else:
-    #         qs = []
-    #         items = []
-
-    #     has_additional = (
-    #         len(items) == page_size if page_size else True
-    #     )  # len(qs) > len(items)s
-    #     page_info = {
-    #         "start_cursor": cls.encode_cursor(items[0].uid) if items else None,
-    #         "end_cursor": cls.encode_cursor(items[-1].uid) if items else None,
-    #     }
-    #     if page_size is not None:
-    #         page_info["has_next_page"] = has_additional
-    #         page_info["has_previous_page"] = bool(after_cursor)
-
-    #     return PageCursor(
-    #         **{
-    #             "total_count": total_count,
-    #             "edges": cls.build_edges(items=items),
-    #             "items": items,
-    #             "page_info": cls.build_page_info(**page_info),
-    #         }
-    #     )
 
-    # @classmethod
-    # def build_edges(cls, items: List[Any]) -> List[EdgeNode]:
-    #     if not items:
-    #         return []
-    #     return [cls.build_node(item) for item in items]
-
-    # @classmethod
-    # def build_node(cls, item: Any) -> EdgeNode:
-    #     return EdgeNode(**{"cursor": cls.encode_cursor(item.uid), "node": item})
-
-    # @classmethod
-    # def build_page_info(
-    #     cls,
-    #     start_cursor: str = None,
-    #     end_cursor: str = None,
-    #     has_next_page: bool = False,
-    #     has_previous_page: bool = False,
-    # ) -> PageInfo:
-    #     return PageInfo(
-    #         **{
-    #             "start_cursor": start_cursor,
-    #             "end_cursor": end_cursor,
-    #             "has_next_page": has_next_page,
-    #             "has_previous_page": has_previous_page,
-    #         }
-    #     )
-
-    # @classmethod
-    # def decode_cursor(cls, cursor):
-    #     return cursor
-
-    # @classmethod
-    # def encode_cursor(cls, identifier: Any):
-    #     return identifier
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def repository_for(model, uow: UnitOfWork) -> BaseRepository:
+    """
+    Repository of `model` bound to `uow`: the BaseRepository subclass
+    declaring that model (built with the unit of work as its argument),
+    else a plain BaseRepository.
+    """
+    for cls in _subclasses(BaseRepository):
+        if getattr(cls, "model", None) is model:
+            return cls(uow)
+    repository = BaseRepository()
+    repository.model = model
+    repository.uow = uow
+    repository.session_factory = uow.session_factory
+    repository.read_session_factory = uow.read_session_factory
+    return repository
@@ -0,0 +1,117 @@
+"""
+Cache of read query results, keyed by the statement and its values.
+
+Every entry remembers the write version of each table the statement
+reads. A write to a table bumps its version (locally when the repository
+writes, and through LISTEN/NOTIFY for other workers), which makes every
+entry reading that table stale without having to find them.
+"""
+import sys
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+from sqlalchemy import Table
+from sqlalchemy.sql.util import find_tables
+
+from core.config import settings
+
+from .cache import materialize, snapshot
+
+Versions = Tuple[Tuple[str, int], ...]
+
+
+class ResultCache:
+    def __init__(self, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._tables: Dict[Hashable, FrozenSet[str]] = {}
+        # key -> (expires, versions, rows, size)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Versions, list, int]]" = (
+            OrderedDict()
+        )
+
+    @staticmethod
+    def enabled(model) -> bool:
+        return getattr(model, "__cache_results__", False)
+
+    def tables(self, stmt, key: Hashable) -> FrozenSet[str]:
+        # statements of one shape read the same tables, key[0] is the shape
+        shape = key[0]
+        if shape not in self._tables:
+            found = find_tables(stmt)
+            names = frozenset(t.name for t in found if isinstance(t, Table))
+            self._tables[shape] = names
+        return self._tables[shape]
+
+    def versions(self, tables: FrozenSet[str]) -> Versions:
+        return tuple(sorted((table, self._versions[table]) for table in tables))
+
+    def bump(self, table: str):
+        self._versions[table] += 1
+
+    def get(self, key: Hashable) -> Optional[List[Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, versions, rows, _ = entry
+            tables = frozenset(table for table, _ in versions)
+            if expires >= time.monotonic() and versions == self.versions(tables):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return [materialize(model, values) for model, values in rows]
+            self._drop(key)
+        self.misses += 1
+        return None
+
+    def set(self, key: Hashable, versions: Versions, items: List[Any]):
+        """
+        Cache `items`, read while the tables were at `versions`. Taken
+        before the query ran, they make results raced by a write stale.
+        """
+        rows = []
+        size = sys.getsizeof(key)
+        for item in items:
+            if not hasattr(item, "_sa_instance_state"):
+                return  # only entities are cached
+            values = snapshot(item)
+            if values is None:
+                return
+            rows.append((type(item), values))
+            size += sum(sys.getsizeof(v) for v in values.values())
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, versions, rows, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[3]
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+        for table in self._versions:
+            self._versions[table] += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.size,
+        }
+
+
+result_cache = ResultCache(
+    settings.DB_RESULT_CACHE_TTL, settings.DB_RESULT_CACHE_SIZE_MB * 1024 * 1024
+)
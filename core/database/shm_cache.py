@@ -0,0 +1,165 @@
+"""
+Host wide entity cache tier: a memory mapped file (in /dev/shm when the
+host has it) that every worker process on the machine maps, so a row
+cached by one worker is a hit for all of them without a network hop.
+
+The file is a set-associative table of fixed size slots. A key hashes to
+one set of `ways` slots and, when the set is full, evicts the least
+recently used slot. Each set is guarded by an fcntl record lock shared by
+the processes, plus a thread lock within the process. Values are pickled
+column snapshots, so only trusted processes may be able to open the file.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+MAGIC = b"SHMCACHE"
+# magic, version, sets, ways, slot size
+HEADER = struct.Struct("<8sIIII")
+# key hash, table hash, expires at, last used (unix time), payload length
+SLOT = struct.Struct("<QQddI")
+VERSION = 1
+
+Key = Tuple[str, str]
+
+
+def _hash(text: str) -> int:
+    # stable across processes, unlike hash(); 0 marks an empty slot
+    digest = hashlib.blake2b(text.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class SharedMemoryCache:
+    def __init__(
+        self, path: str, size: int, ttl: float, slot_size: int = 1024, ways: int = 8
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.slot_size = slot_size
+        self.ways = ways
+        self.sets = max(1, (size - HEADER.size) // (slot_size * ways))
+        self._size = HEADER.size + self.sets * ways * slot_size
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._init_file()
+        self._mm = mmap.mmap(self._fd, self._size)
+
+    def _init_file(self):
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, HEADER.size, 0)
+        try:
+            header = os.pread(self._fd, HEADER.size, 0)
+            expected = HEADER.pack(MAGIC, VERSION, self.sets, self.ways, self.slot_size)
+            if header != expected or os.fstat(self._fd).st_size != self._size:
+                # new file or other geometry: start over
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self._size)
+                os.pwrite(self._fd, expected, 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, HEADER.size, 0)
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+    def _set_offset(self, key_hash: int) -> int:
+        index = key_hash % self.sets
+        return HEADER.size + index * self.ways * self.slot_size
+
+    @contextmanager
+    def _locked(self, set_offset: int):
+        length = self.ways * self.slot_size
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, set_offset)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, set_offset)
+
+    def _slots(self, set_offset: int):
+        for way in range(self.ways):
+            offset = set_offset + way * self.slot_size
+            yield offset, SLOT.unpack_from(self._mm, offset)
+
+    def __len__(self):
+        now = time.time()
+        count = 0
+        for set_index in range(self.sets):
+            offset = HEADER.size + set_index * self.ways * self.slot_size
+            for _, (key_hash, _, expires, _, _) in self._slots(offset):
+                count += bool(key_hash) and expires >= now
+        return count
+
+    def get(self, key: Key) -> Optional[dict]:
+        key_hash = _hash("|".join(key))
+        set_offset = self._set_offset(key_hash)
+        now = time.time()
+        with self._locked(set_offset):
+            for offset, slot in self._slots(set_offset):
+                slot_hash, table_hash, expires, _, length = slot
+                if slot_hash != key_hash:
+                    continue
+                if expires < now:
+                    SLOT.pack_into(self._mm, offset, 0, 0, 0.0, 0.0, 0)
+                    return None
+                start = offset + SLOT.size
+                stored_key, values = pickle.loads(self._mm[start : start + length])
+                if stored_key != key:
+                    return None
+                SLOT.pack_into(
+                    self._mm, offset, slot_hash, table_hash, expires, now, length
+                )
+                return values
+        return None
+
+    def set(self, key: Key, values: dict):
+        payload = pickle.dumps((key, values), protocol=pickle.HIGHEST_PROTOCOL)
+        if SLOT.size + len(payload) > self.slot_size:
+            return  # too big for a slot, the local tier still has it
+        key_hash = _hash("|".join(key))
+        set_offset = self._set_offset(key_hash)
+        now = time.time()
+        with self._locked(set_offset):
+            victim, victim_used = None, None
+            for offset, (slot_hash, _, expires, used, _) in self._slots(set_offset):
+                if slot_hash == key_hash:
+                    victim = offset
+                    break
+                if not slot_hash or expires < now:
+                    used = -1.0  # free slots go first
+                if victim is None or used < victim_used:
+                    victim, victim_used = offset, used
+            SLOT.pack_into(
+                self._mm,
+                victim,
+                key_hash,
+                _hash(key[0]),
+                now + self.ttl,
+                now,
+                len(payload),
+            )
+            start = victim + SLOT.size
+            self._mm[start : start + len(payload)] = payload
+
+    def delete(self, key: Key):
+        key_hash = _hash("|".join(key))
+        set_offset = self._set_offset(key_hash)
+        with self._locked(set_offset):
+            for offset, (slot_hash, *_) in self._slots(set_offset):
+                if slot_hash == key_hash:
+                    SLOT.pack_into(self._mm, offset, 0, 0, 0.0, 0.0, 0)
+
+    def clear(self, table: Optional[str] = None):
+        table_hash = _hash(table) if table is not None else None
+        for set_index in range(self.sets):
+            set_offset = HEADER.size + set_index * self.ways * self.slot_size
+            with self._locked(set_offset):
+                for offset, (_, slot_table, *_) in self._slots(set_offset):
+                    if table_hash is None or slot_table == table_hash:
+                        SLOT.pack_into(self._mm, offset, 0, 0, 0.0, 0.0, 0)
@@ -0,0 +1,76 @@
+"""
+Single-flight reads: while a query is running, identical queries from
+other callers in this worker wait for its result instead of sending
+their own. This keeps a burst of requests for one uid or list, e.g.
+right after a cache entry expired, from turning into a burst of queries.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+def statement_key(stmt, params: Optional[dict] = None) -> Optional[Hashable]:
+    """
+    Identity of a statement and its values, None when SQLAlchemy cannot
+    tell statements apart (the statement is not cacheable).
+    """
+    cache_key = stmt._generate_cache_key()
+    if cache_key is None:
+        return None
+    values = [bind.effective_value for bind in cache_key.bindparams]
+    return cache_key.key, repr(values), repr(sorted((params or {}).items()))
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(
+        self, key: Hashable, load: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Result of `load`, run once for every concurrent caller of `key`.
+        Also tells whether the result is shared, i.e. was loaded by
+        another caller; shared results must not be mutated.
+        """
+        while key in self._inflight:
+            future = self._inflight[key]
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # the leader was cancelled rather than us: try again
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+            self.coalesced += 1
+            return result, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.leaders += 1
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # followers re-raise it, nothing left to log
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        queries = self.leaders + self.coalesced
+        return {
+            "queries": self.leaders,
+            "coalesced": self.coalesced,
+            "saved_ratio": self.coalesced / queries if queries else 0.0,
+        }
+
+
+single_flight = SingleFlight()
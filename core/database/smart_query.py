@@ -0,0 +1,225 @@
+"""
+Django style filters for any DBModel, compiled to SQLAlchemy criteria:
+
+    smart_query(User, {
+        "created_at__gte": since,
+        or_: {"first_name__ilike": "an%", "last_name__in": ["Doe", "Roe"]},
+        "groups___name": "admins",
+    }, sort_attrs=["-created_at"])
+
+Keys are `attribute__operator` (the operator defaults to eq). Attributes
+on related models are reached with `___` between relationship names and
+become EXISTS subqueries. `and_` / `or_` (or "and" / "or") keys nest
+groups; a list of filter dicts is an and.
+
+Values are never part of the compiled statement. Filters with the same
+shape, i.e. the same keys, operators and NULL checks, share one cached
+statement and only their parameters differ.
+"""
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, func, or_, select
+
+from .statements import statement_cache
+
+OPERATORS: Dict[str, Callable[..., Any]] = {
+    "eq": lambda c, v: c == v,
+    "ne": lambda c, v: c != v,
+    "gt": lambda c, v: c > v,
+    "gte": lambda c, v: c >= v,
+    "lt": lambda c, v: c < v,
+    "lte": lambda c, v: c <= v,
+    "in": lambda c, v: c.in_(v),
+    "notin": lambda c, v: c.not_in(v),
+    "like": lambda c, v: c.like(v),
+    "ilike": lambda c, v: c.ilike(v),
+    "startswith": lambda c, v: c.startswith(v),
+    "istartswith": lambda c, v: c.istartswith(v),
+    "endswith": lambda c, v: c.endswith(v),
+    "iendswith": lambda c, v: c.iendswith(v),
+    "contains": lambda c, v: c.contains(v),
+    "icontains": lambda c, v: c.icontains(v),
+    "between": lambda c, lo, hi: c.between(lo, hi),
+    "isnull": None,  # no parameter, part of the shape
+}
+
+_GROUPS = {and_: and_, or_: or_, "and": and_, "or": or_, "and_": and_, "or_": or_}
+
+_resolved: Dict[Tuple[Any, str], Tuple[Any, List[Any]]] = {}
+
+
+def _split(key: str) -> Tuple[str, str]:
+    path, _, op = key.partition("__")
+    if op.startswith("_"):
+        # `a___b`: the first "__" belongs to a relationship hop
+        hops = key.split("___")
+        attr, _, op = hops[-1].partition("__")
+        path = "___".join(hops[:-1] + [attr])
+    op = op or "eq"
+    if op not in OPERATORS:
+        raise ValueError(f"Unknown filter operator '{op}' in '{key}'")
+    return path, op
+
+
+def resolve(model, path: str) -> Tuple[Any, List[Any]]:
+    """Column attribute at the end of `path` and the relationships leading there"""
+    key = (model, path)
+    if key not in _resolved:
+        relationships = []
+        current = model
+        *hops, name = path.split("___")
+        for hop in hops:
+            relationship = getattr(current, hop, None)
+            if relationship is None or not hasattr(relationship.property, "mapper"):
+                raise KeyError(f"Relationship '{hop}' doesn't exist on {current}")
+            relationships.append(relationship)
+            current = relationship.property.mapper.class_
+        column = getattr(current, name, None)
+        if column is None:
+            raise KeyError(f"Attribute '{name}' doesn't exist on {current}")
+        _resolved[key] = (column, relationships)
+    return _resolved[key]
+
+
+def _items(node: Dict[Any, Any]):
+    # a stable order, keys may be functions as well as strings
+    return sorted(node.items(), key=lambda item: str(_GROUPS.get(item[0], item[0])))
+
+
+def _leaf_shape(op: str, value: Any) -> Hashable:
+    if op == "isnull":
+        return bool(value)
+    if op in ("eq", "ne"):
+        return value is None
+    return None
+
+
+def _leaf_params(op: str, value: Any) -> List[Any]:
+    if op == "isnull" or (op in ("eq", "ne") and value is None):
+        return []
+    if op == "between":
+        return list(value)
+    if op in ("in", "notin"):
+        return [list(value)]
+    return [value]
+
+
+def _walk(node: Any, params: List[Any]) -> Hashable:
+    """Shape of the filter tree, collecting its values in traversal order"""
+    if isinstance(node, (list, tuple)):
+        return ("and", tuple(_walk(child, params) for child in node))
+    shape = []
+    for key, value in _items(node):
+        group = _GROUPS.get(key)
+        if group is not None:
+            shape.append((group.__name__, _walk(value, params)))
+            continue
+        _, op = _split(key)
+        params.extend(_leaf_params(op, value))
+        shape.append((key, _leaf_shape(op, value)))
+    return tuple(shape)
+
+
+def _combine(group, criteria):
+    criteria = [c for c in criteria if c is not None]
+    return group(*criteria) if criteria else None
+
+
+def _build(model, node: Any, names: List[str]):
+    """Criteria for the filter tree, bind parameters named in _walk's order"""
+
+    def bound(column, expanding=False):
+        name = f"sq_{len(names)}"
+        names.append(name)
+        return bindparam(name, type_=column.type, expanding=expanding)
+
+    if isinstance(node, (list, tuple)):
+        return _combine(and_, [_build(model, child, names) for child in node])
+    criteria = []
+    for key, value in _items(node):
+        group = _GROUPS.get(key)
+        if group is not None:
+            if isinstance(value, (list, tuple)):
+                children = value
+            else:
+                children = [{k: v} for k, v in _items(value)]
+            built = [_build(model, child, names) for child in children]
+            criteria.append(_combine(group, built))
+            continue
+        path, op = _split(key)
+        column, relationships = resolve(model, path)
+        if op == "isnull":
+            criterion = column.is_(None) if value else column.is_not(None)
+        elif value is None and op in ("eq", "ne"):
+            criterion = column.is_(None) if op == "eq" else column.is_not(None)
+        elif op == "between":
+            criterion = OPERATORS[op](column, bound(column), bound(column))
+        else:
+            expanding = op in ("in", "notin")
+            criterion = OPERATORS[op](column, bound(column, expanding))
+        for relationship in reversed(relationships):
+            if relationship.property.uselist:
+                criterion = relationship.any(criterion)
+            else:
+                criterion = relationship.has(criterion)
+        criteria.append(criterion)
+    return _combine(and_, criteria)
+
+
+def signature(filters: Any) -> Tuple[Hashable, List[Any]]:
+    """Shape of `filters` and its parameter values"""
+    values: List[Any] = []
+    shape = _walk(filters or {}, values)
+    return shape, values
+
+
+def _sorting(model, sort_attrs: Optional[List[str]]):
+    order = []
+    for attr in sort_attrs or []:
+        column, relationships = resolve(model, attr.lstrip("-"))
+        if relationships:
+            raise KeyError(f"Cannot sort by related attribute '{attr}'")
+        order.append(column.desc() if attr.startswith("-") else column.asc())
+    return order
+
+
+def _compile(model, kind: str, filters, sort_attrs, limit, build):
+    shape, values = signature(filters)
+    sorting = tuple(sort_attrs or ())
+    names: List[str] = []
+
+    def compile_shape():
+        criteria = _build(model, filters or {}, names)
+        return build(criteria), list(names)
+
+    stmt, names = statement_cache.get(
+        model, ("smart", kind, shape, sorting, limit), compile_shape
+    )
+    return stmt, dict(zip(names, values))
+
+
+def smart_query(
+    model,
+    filters: Any = None,
+    sort_attrs: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+) -> Tuple[Any, Dict[str, Any]]:
+    """Cached select of `model` matching `filters`, and its parameters"""
+
+    def build(criteria):
+        stmt = select(model).order_by(*_sorting(model, sort_attrs))
+        if criteria is not None:
+            stmt = stmt.where(criteria)
+        return stmt.limit(limit) if limit else stmt
+
+    return _compile(model, "select", filters, sort_attrs, limit, build)
+
+
+def smart_count(model, filters: Any = None) -> Tuple[Any, Dict[str, Any]]:
+    """Cached count of `model` rows matching `filters`, and its parameters"""
+
+    def build(criteria):
+        stmt = select(func.count()).select_from(model)
+        return stmt.where(criteria) if criteria is not None else stmt
+
+    return _compile(model, "count", filters, None, None, build)
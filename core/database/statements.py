@@ -0,0 +1,45 @@
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from sqlalchemy import bindparam, select
+
+
+class StatementCache:
+    """
+    Registry of repository statements keyed by model and query shape.
+
+    Values are never baked into the statements, they are bound when the
+    statement is executed. Each shape is therefore built once, compiled
+    once by SQLAlchemy and prepared once per connection by asyncpg.
+    """
+
+    def __init__(self):
+        self._statements: Dict[Tuple[Any, Hashable], Any] = {}
+
+    def get(self, model, shape: Hashable, build: Callable[[], Any]):
+        key = (model, shape)
+        stmt = self._statements.get(key)
+        if stmt is None:
+            stmt = self._statements[key] = build()
+        return stmt
+
+    def clear(self):
+        self._statements.clear()
+
+
+statement_cache = StatementCache()
+
+
+def find_by_uid(model):
+    return statement_cache.get(
+        model, "find", lambda: select(model).where(model.uid == bindparam("uid"))
+    )
+
+
+def find_by_uids(model):
+    return statement_cache.get(
+        model,
+        "get_by_uids",
+        lambda: select(model)
+        .where(model.uid.in_(bindparam("uids", expanding=True)))
+        .order_by(model.uid),
+    )
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from opentelemetry.metrics import Observation, get_meter
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolTelemetry:
+    """
+    Connection pool statistics of one engine, labeled e.g. "primary" or
+    "replica-0": checked out / idle / overflow counts from the pool
+    itself, plus how long callers waited for a connection and how old the
+    pooled connections are.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.pool = None
+        self._lock = threading.Lock()
+        self._connected_at: Dict[int, float] = {}
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def attach(self, pool):
+        self.pool = pool
+        pool.telemetry = self
+
+        @event.listens_for(pool, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            self._connected_at[id(connection_record)] = time.monotonic()
+
+        @event.listens_for(pool, "close")
+        def on_close(dbapi_connection, connection_record):
+            self._connected_at.pop(id(connection_record), None)
+
+    def stats(self) -> dict:
+        pool = self.pool
+        now = time.monotonic()
+        ages = [now - born for born in list(self._connected_at.values())]
+        return {
+            "engine": self.label,
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "wait": {
+                "count": self.wait_count,
+                "avg_ms": 1000 * self.wait_total / self.wait_count
+                if self.wait_count
+                else 0.0,
+                "max_ms": 1000 * self.wait_max,
+            },
+            "connection_age": {
+                "connections": len(ages),
+                "min_s": min(ages, default=0.0),
+                "max_s": max(ages, default=0.0),
+                "avg_s": sum(ages) / len(ages) if ages else 0.0,
+            },
+        }
+
+
+# one per engine, by label
+pool_telemetries: Dict[str, PoolTelemetry] = {}
+
+
+def attach_telemetry(engine, label: str) -> PoolTelemetry:
+    telemetry = PoolTelemetry(label)
+    telemetry.attach(engine.pool)
+    pool_telemetries[label] = telemetry
+    return telemetry
+
+
+def register_pool_metrics():
+    """
+    Expose the pools as OpenTelemetry observable gauges, one series per
+    engine with an `engine` attribute. Call once per process.
+    """
+    meter = get_meter(__name__)
+
+    def gauge(name, unit, description, read):
+        def observe(options):
+            return [
+                Observation(read(telemetry.stats()), {"engine": label})
+                for label, telemetry in list(pool_telemetries.items())
+            ]
+
+        meter.create_observable_gauge(
+            f"db.pool.{name}",
+            callbacks=[observe],
+            unit=unit,
+            description=description,
+        )
+
+    gauge("checked_out", "1", "Connections in use", lambda s: s["checked_out"])
+    gauge("idle", "1", "Idle pooled connections", lambda s: s["idle"])
+    gauge("overflow", "1", "Connections over pool size", lambda s: s["overflow"])
+    gauge("wait.max", "ms", "Longest checkout wait", lambda s: s["wait"]["max_ms"])
+    gauge(
+        "connection_age.max",
+        "s",
+        "Age of the oldest pooled connection",
+        lambda s: s["connection_age"]["max_s"],
+    )
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited"""
+
+    # pool logs under its own module name, keep it as quiet as sqlalchemy's
+    logging.getLogger(f"{__name__}.InstrumentedAsyncPool").setLevel(logging.WARN)
+
+    telemetry: Optional[PoolTelemetry] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.telemetry is not None:
+                self.telemetry.record_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        # dispose() swaps in a new pool, it keeps reporting to our telemetry
+        pool = super().recreate()
+        if self.telemetry is not None:
+            self.telemetry.pool = pool
+            pool.telemetry = self.telemetry
+        return pool
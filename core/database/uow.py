@@ -0,0 +1,115 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Iterable, Optional, Set
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import object_session
+
+from .counting import count_cache
+from .db import get_async_read_session, get_async_session
+from .result_cache import result_cache
+
+
+class UnitOfWork:
+    """
+    One session and one transaction shared by every repository call made
+    while handling a request, committed once by `complete()`: before the
+    response is sent for HTTP requests (see UnitOfWorkMiddleware and the
+    GraphQL UnitOfWorkExtension), else when the unit of work exits.
+
+    Repositories flush instead of committing while a unit of work is
+    active. Its sessions are opened lazily and used by one coroutine at
+    a time, since GraphQL resolvers may run concurrently.
+    """
+
+    def __init__(self, session_factory=None, read_session_factory=None):
+        self.session_factory = session_factory or get_async_session()
+        self.read_session_factory = read_session_factory or get_async_read_session()
+        self.dirty = False
+        self._tables: Set[str] = set()
+        self._session: Optional[AsyncSession] = None
+        self._read_session: Optional[AsyncSession] = None
+        self._lock = asyncio.Lock()
+        self._read_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncGenerator[AsyncSession, None]:
+        async with self._lock:
+            if self._session is None:
+                self._session = self.session_factory()
+            yield self._session
+
+    @asynccontextmanager
+    async def read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """Replica session, or the primary one once this unit has written"""
+        if self.dirty or self.read_session_factory is self.session_factory:
+            async with self.session() as session:
+                yield session
+            return
+        async with self._read_lock:
+            if self._read_session is None:
+                self._read_session = self.read_session_factory()
+            yield self._read_session
+
+    def wrote(self, table: str):
+        self.dirty = True
+        self._tables.add(table)
+
+    async def release(self, objs: Iterable[Any]):
+        """
+        Detach entities read through the replica session, and what they
+        cascade to, so that the primary session can take them over for a
+        write. Pending changes on them are kept.
+        """
+        if self._read_session is None:
+            return
+        async with self._read_lock:
+            read = self._read_session.sync_session
+            for obj in objs:
+                state = inspect(obj)
+                cascaded = state.mapper.cascade_iterator("save-update", state)
+                for item in [obj, *(related for related, *_ in cascaded)]:
+                    if object_session(item) is read:
+                        read.expunge(item)
+
+    async def commit(self):
+        if self._session is not None:
+            async with self._lock:
+                await self._session.commit()
+        # reads racing the transaction may have cached the old rows, the
+        # caches were only invalidated when the writes were flushed
+        for table in self._tables:
+            count_cache.invalidate(table)
+            result_cache.bump(table)
+        self._tables.clear()
+
+    async def rollback(self):
+        if self._session is not None:
+            async with self._lock:
+                await self._session.rollback()
+
+    async def close(self):
+        for session in (self._session, self._read_session):
+            if session is not None:
+                await session.close()
+        self._session = self._read_session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def complete(self, commit: bool = True):
+        """
+        Commit, or roll back, and release the sessions. Completing again
+        only commits what was written since.
+        """
+        try:
+            if commit:
+                await self.commit()
+            else:
+                await self.rollback()
+        finally:
+            await self.close()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.complete(commit=exc_type is None)
@@ -1 +1,3 @@
-from .acquire import get_graphql_context, get_service
+from .acquire import get_graphql_context, get_loader, get_service
+from .extensions import UnitOfWorkExtension
+from .types import CountMode
@@ -2,13 +2,20 @@ from fastapi import Depends
 from strawberry.types import Info
 
 from apps.user.service import UserService
+from core.database.deps import get_unit_of_work
+from core.database.uow import UnitOfWork
+
+from .loaders import Loaders
 
 
 # GraphQL Dependency Context
 def get_graphql_context(
+    uow: UnitOfWork = Depends(get_unit_of_work),
     user_service: UserService = Depends(),
 ):
     return {
+        "uow": uow,
+        "loaders": Loaders(uow),
         "user_service": user_service,
     }
 
@@ -16,3 +23,8 @@ def get_graphql_context(
 # Extract AuthorService instance from GraphQL context
 def get_service(info: Info, service_name: str):
     return info.context[service_name]
+
+
+# Batching DataLoader of a model's entities by uid
+def get_loader(info: Info, model):
+    return info.context["loaders"][model]
@@ -0,0 +1,16 @@
+from strawberry.extensions import SchemaExtension
+
+
+class UnitOfWorkExtension(SchemaExtension):
+    """
+    Completes the request's unit of work once the operation is done.
+    Strawberry turns resolver exceptions into `errors` of a 200 response,
+    so a failed mutation rolls back here rather than having its earlier
+    writes committed with the request.
+    """
+
+    async def on_operation(self):
+        yield
+        uow = self.execution_context.context.get("uow")
+        if uow is not None:
+            await uow.complete(commit=not self.execution_context.errors)
@@ -0,0 +1,30 @@
+from typing import Any, Dict, List
+
+from strawberry.dataloader import DataLoader
+
+from core.database.repository import repository_for
+from core.database.uow import UnitOfWork
+
+
+class Loaders:
+    """
+    Per request DataLoaders, one per model, created on first use. Uids
+    requested in the same tick are fetched with a single `get_by_uids`
+    and every uid is loaded at most once per request.
+    """
+
+    def __init__(self, uow: UnitOfWork):
+        self.uow = uow
+        self._loaders: Dict[Any, DataLoader] = {}
+
+    def __getitem__(self, model) -> DataLoader:
+        if model not in self._loaders:
+            repository = repository_for(model, self.uow)
+
+            async def load(uids: List[Any]) -> List[Any]:
+                items = await repository.get_by_uids(uids)
+                by_uid = {str(item.uid): item for item in items}
+                return [by_uid.get(str(uid)) for uid in uids]
+
+            self._loaders[model] = DataLoader(load_fn=load, cache_key_fn=str)
+        return self._loaders[model]
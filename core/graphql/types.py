@@ -0,0 +1,7 @@
+import strawberry
+
+from core.database.counting import CountMode as _CountMode
+
+CountMode = strawberry.enum(
+    _CountMode, description="Exact, estimated or cached total counts"
+)
@@ -1,23 +1,49 @@
-from typing import NewType
+import asyncio
+from datetime import datetime
+from typing import List, NewType, Optional, Tuple
 
 import strawberry
-from sqlalchemy import String
+from sqlalchemy import BigInteger, String
 
+from core.config import settings
+from core.uid_gen.lease import WorkerLease, lease_from_settings
+from core.uid_gen.pool import UIDPool
 from core.uid_gen.snow_flake import Snowflake
 from core.uid_gen.sony_flake import SonyFlake
 
+# Store uids as native BIGINT instead of text, they are only turned into
+# strings at the API edge (GraphQL scalar, pydantic json encoding)
+USE_BIGINT_IDS = settings.UID_BIGINT
+
+
+class FelicityIntID(int):
+    """Integer uid that serializes to a string for API clients"""
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, v):
+        return cls(int(v))
+
+    @classmethod
+    def __modify_schema__(cls, field_schema):
+        field_schema.update(type="string")
+
+
 # For sqlalchemy tables
-FelicitySAID = String
+FelicitySAID = BigInteger if USE_BIGINT_IDS else String
 
 # For Graphql
 FelicityID = strawberry.scalar(
     NewType("FelicityID", strawberry.ID),
     serialize=lambda v: str(v),
-    parse_value=lambda v: str(v),
+    parse_value=lambda v: int(v) if USE_BIGINT_IDS else str(v),
 )
 
 # For Pydantic
-FelicityIDType = str
+FelicityIDType = FelicityIntID if USE_BIGINT_IDS else str
 
 
 #######################################################
@@ -25,8 +51,109 @@ USE_SNOW_FLAKE = True
 
 snow = Snowflake()
 sony = SonyFlake()
+lease: Optional[WorkerLease] = None
+pool: Optional[UIDPool] = None
+
+
+def set_worker_id(worker_id: int, machine_id: Optional[int] = None):
+    """Stamp ids generated by this process with a leased worker id"""
+    snow.process_id = worker_id & Snowflake.process_mask
+    sony.machine_id = worker_id if machine_id is None else machine_id
+    if pool is not None:
+        pool.clear()
+
+
+def acquire_worker_lease() -> Optional[int]:
+    """Lease a process wide worker id so that workers and nodes never collide"""
+    global lease
+    lease = lease_from_settings()
+    if lease is None:
+        return None
+
+    def on_change(slot: int):
+        set_worker_id(slot, lease.machine_id())
+
+    lease.on_change = on_change
+    slot = lease.acquire()
+    on_change(slot)
+    return slot
+
+
+def release_worker_lease():
+    global lease
+    if lease is not None:
+        lease.release()
+        lease = None
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _check_lease():
+    # ids stamped with a slot that another worker may have claimed collide
+    if lease is not None and not lease.valid():
+        raise RuntimeError("uid worker lease expired, cannot generate uids")
+
+
+def _to_uid(uid: int) -> FelicityIDType:
+    return uid if USE_BIGINT_IDS else str(uid)
+
+
+def get_flake_uid() -> FelicityIDType:
+    if pool is not None:
+        uid = pool.pop()
+        if uid is not None:
+            return uid
+    _check_lease()
+    # never park the event loop thread, e.g. when called as a model default
+    # during an async flush; borrowed ids are just as unique
+    block = not _on_event_loop()
+    uid = snow.next_id(block) if USE_SNOW_FLAKE else sony.next_id(block)
+    return _to_uid(uid)
+
+
+async def get_flake_uid_async() -> FelicityIDType:
+    _check_lease()
+    uid = await (snow.next_id_async() if USE_SNOW_FLAKE else sony.next_id_async())
+    return _to_uid(uid)
+
+
+def start_uid_pool() -> Optional[UIDPool]:
+    """Keep UID_POOL_DEPTH uids ready so that inserts just pop one"""
+    global pool
+    if settings.UID_POOL_DEPTH <= 0:
+        return None
+    pool = UIDPool(
+        get_flake_uids,
+        settings.UID_POOL_DEPTH,
+        settings.UID_POOL_REFILL_AT,
+        settings.UID_POOL_MAX_AGE_MS,
+    )
+    pool.start()
+    return pool
+
+
+def stop_uid_pool():
+    global pool
+    if pool is not None:
+        pool.stop()
+        pool = None
+
+
+def get_flake_uids(n: int) -> List[FelicityIDType]:
+    """Reserve `n` uids in one call, e.g. for bulk loads"""
+    _check_lease()
+    uids = snow.next_batch(n) if USE_SNOW_FLAKE else sony.next_ids(n)
+    if USE_BIGINT_IDS:
+        return uids
+    return [str(uid) for uid in uids]
 
 
-def get_flake_uid() -> str:
-    uid = next(snow).snowflake if USE_SNOW_FLAKE else next(sony).sonyflake
-    return str(uid)
+def uid_bounds(start: datetime, end: datetime) -> Tuple[int, int]:
+    """Integer uid range covering everything generated between start and end"""
+    return snow.bounds(start, end) if USE_SNOW_FLAKE else sony.bounds(start, end)
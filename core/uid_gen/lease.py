@@ -0,0 +1,270 @@
+import asyncio
+import fcntl
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from socket import gethostname
+from typing import Callable, Optional
+
+import asyncpg
+
+from core.config import settings
+
+from .sony_flake import lower_16bit_private_ip
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class WorkerLease:
+    """
+    Hands the current process a worker slot that no other live process
+    holds, so that every worker can stamp its uids with a distinct
+    process/machine id.
+    """
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.slot: Optional[int] = None
+        self.on_change: Optional[Callable[[int], None]] = None
+
+    def acquire(self) -> int:
+        raise NotImplementedError
+
+    def renew(self) -> None:
+        ...
+
+    def release(self) -> None:
+        ...
+
+    def valid(self) -> bool:
+        """Whether ids may be stamped with the slot right now"""
+        return self.slot is not None
+
+    def machine_id(self) -> int:
+        """SonyFlake machine id derived from the leased slot"""
+        return self.slot
+
+
+class FileLease(WorkerLease):
+    """
+    Host local lease: one lock file per slot, held with `flock` for the
+    lifetime of the process. The kernel drops the lock when the process
+    dies, so there is nothing to renew.
+    """
+
+    def __init__(self, directory: str, slots: int):
+        super().__init__(slots)
+        self.directory = directory
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        for slot in range(self.slots):
+            path = os.path.join(self.directory, f"slot-{slot}.lock")
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+            self._fd = fd
+            self.slot = slot
+            return slot
+        raise RuntimeError(f"No free uid worker slot in {self.directory}")
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+            self.slot = None
+
+    def machine_id(self) -> int:
+        # slots are only unique per host: keep all 16 host bits and flip the
+        # top ones with the bit reversed slot. Slot 0 is the host's plain id,
+        # a slot never collides with the same slot of another host, and other
+        # slots only with hosts 2**15, 2**14, ... addresses away
+        slot = int(f"{self.slot & 0x3F:06b}"[::-1], 2)
+        return lower_16bit_private_ip() ^ (slot << 10)
+
+
+class DatabaseLease(WorkerLease):
+    """
+    Cluster wide lease kept in a table. A slot belongs to its owner until
+    `expires_at`; a background task renews it every `ttl / 3` seconds and
+    re-acquires a new slot if the lease was lost.
+
+    The lease talks to Postgres through asyncpg on a private event loop
+    thread, so the sync API can also be used from the app's own loop.
+    While renewals fail the lease stays valid until its last `expires_at`
+    at most, after that `valid()` is False until a renewal gets through.
+    """
+
+    table = "uid_worker_lease"
+
+    def __init__(self, dsn: str, slots: int, ttl: int):
+        super().__init__(slots)
+        self.dsn = dsn
+        self.ttl = ttl
+        self.owner = f"{gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._valid_until = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._renewer: Optional[Future] = None
+
+    def _run(self, coro):
+        """Run `coro` on the lease's loop and wait for its result"""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._loop.run_forever, name="uid-lease", daemon=True
+            )
+            self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _fetchval(self, query: str, *args):
+        timeout = self.ttl / 3
+        connection = await asyncpg.connect(self.dsn, timeout=timeout)
+        try:
+            return await connection.fetchval(query, *args, timeout=timeout)
+        finally:
+            await connection.close()
+
+    def _extend(self, started: float):
+        # the row expires `ttl` after the statement ran, never before we sent it
+        self._valid_until = started + self.ttl
+
+    async def _claim(self) -> Optional[int]:
+        started = time.monotonic()
+        slot = await self._fetchval(
+            f"""
+            INSERT INTO {self.table} (slot, owner, expires_at)
+            SELECT s, $1, now() + make_interval(secs => $2)
+            FROM generate_series(0, $3 - 1) AS s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {self.table} l
+                WHERE l.slot = s AND l.expires_at > now()
+            )
+            ORDER BY s
+            LIMIT 1
+            ON CONFLICT (slot) DO UPDATE
+            SET owner = EXCLUDED.owner, expires_at = EXCLUDED.expires_at
+            WHERE {self.table}.expires_at <= now()
+            RETURNING slot
+            """,
+            self.owner,
+            float(self.ttl),
+            self.slots,
+        )
+        if slot is not None:
+            self._extend(started)
+        return slot
+
+    async def _acquire_slot(self) -> int:
+        await self._fetchval(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                slot INTEGER PRIMARY KEY,
+                owner VARCHAR(128) NOT NULL,
+                expires_at TIMESTAMPTZ NOT NULL
+            )
+            """
+        )
+        # a concurrent worker may win the same free slot, just try again
+        for _ in range(self.slots):
+            slot = await self._claim()
+            if slot is not None:
+                return slot
+        raise RuntimeError(f"No free uid worker slot in table {self.table}")
+
+    def acquire(self) -> int:
+        self.slot = self._run(self._acquire_slot())
+        self._renewer = asyncio.run_coroutine_threadsafe(
+            self._renew_forever(), self._loop
+        )
+        return self.slot
+
+    def valid(self) -> bool:
+        return self.slot is not None and time.monotonic() < self._valid_until
+
+    async def _renew(self):
+        started = time.monotonic()
+        renewed = await self._fetchval(
+            f"""
+            UPDATE {self.table}
+            SET expires_at = now() + make_interval(secs => $1)
+            WHERE slot = $2 AND owner = $3
+            RETURNING slot
+            """,
+            float(self.ttl),
+            self.slot,
+            self.owner,
+        )
+        if renewed is not None:
+            self._extend(started)
+            return
+        logger.warning(f"uid worker lease on slot {self.slot} was lost")
+        self._valid_until = 0.0
+        self.slot = await self._acquire_slot()
+        if self.on_change:
+            self.on_change(self.slot)
+
+    def renew(self) -> None:
+        self._run(self._renew())
+
+    async def _renew_forever(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await self._renew()
+            except Exception as e:
+                if self.valid():
+                    logger.error(f"Failed to renew uid worker lease: {e}")
+                else:
+                    logger.error(
+                        "uid worker lease expired, no uids are generated "
+                        f"until it is renewed: {e}"
+                    )
+
+    async def _release(self):
+        if self._renewer is not None:
+            self._renewer.cancel()
+            self._renewer = None
+        if self.slot is not None:
+            await self._fetchval(
+                f"DELETE FROM {self.table} WHERE slot = $1 AND owner = $2",
+                self.slot,
+                self.owner,
+            )
+
+    def release(self) -> None:
+        if self._loop is None:
+            return
+        try:
+            self._run(self._release())
+        finally:
+            self.slot = None
+            self._valid_until = 0.0
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = self._thread = None
+
+
+def lease_from_settings() -> Optional[WorkerLease]:
+    backend = settings.UID_LEASE_BACKEND
+    if backend == "file":
+        return FileLease(settings.UID_LEASE_DIR, settings.UID_LEASE_SLOTS)
+    if backend == "db":
+        return DatabaseLease(
+            str(settings.SQLALCHEMY_DATABASE_URI),
+            settings.UID_LEASE_SLOTS,
+            settings.UID_LEASE_TTL,
+        )
+    return None
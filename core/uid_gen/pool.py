@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UIDPool:
+    """
+    Ring buffer of ready made uids, topped up by a background thread
+    whenever it drops below `refill_at`.
+
+    `pop` is O(1) and never waits: it returns None when the pool is
+    drained so that callers can fall back to generating directly.
+
+    Uids carry the time they were generated, so pooled ones older than
+    `max_age_ms` are dropped rather than handed out: time window queries
+    on uids would otherwise miss the rows they keyed.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[int], List[Any]],
+        depth: int,
+        refill_at: Optional[int] = None,
+        max_age_ms: int = 1000,
+    ):
+        self.generate = generate
+        self.depth = depth
+        self.refill_at = depth // 2 if refill_at is None else refill_at
+        self.max_age = max_age_ms / 1000
+        # (generated at, uid), oldest first
+        self._uids: deque = deque()
+        # bumped by clear(), refills started before it are discarded
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self):
+        return len(self._uids)
+
+    def start(self):
+        self._stop.clear()
+        self._wanted.set()
+        self._thread = threading.Thread(
+            target=self._refill_forever, name="uid-pool", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wanted.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.clear()
+
+    def clear(self):
+        """Drop pooled uids, e.g. after the worker id changed"""
+        with self._lock:
+            self._generation += 1
+            self._uids.clear()
+        self._wanted.set()
+
+    def _expire(self, now: float):
+        try:
+            if now - self._uids[-1][0] > self.max_age:
+                # even the newest is too old
+                self._uids.clear()
+                return
+            while now - self._uids[0][0] > self.max_age:
+                self._uids.popleft()
+        except IndexError:
+            pass
+
+    def pop(self) -> Optional[Any]:
+        self._expire(time.monotonic())
+        try:
+            _, uid = self._uids.popleft()
+        except IndexError:
+            self._wanted.set()
+            return None
+        if len(self._uids) < self.refill_at:
+            self._wanted.set()
+        return uid
+
+    def _refill(self):
+        generation = self._generation
+        missing = self.depth - len(self._uids)
+        if missing <= 0:
+            return
+        born = time.monotonic()
+        uids = self.generate(missing)
+        with self._lock:
+            if generation == self._generation:
+                self._uids.extend((born, uid) for uid in uids)
+
+    def _refill_forever(self):
+        while True:
+            self._wanted.wait()
+            if self._stop.is_set():
+                return
+            self._wanted.clear()
+            try:
+                self._refill()
+            except Exception as e:
+                # e.g. the worker lease expired, retry once it may be back
+                logger.warning(f"Could not refill the uid pool: {e}")
+                self._stop.wait(1)
+                self._wanted.set()
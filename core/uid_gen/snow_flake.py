@@ -1,5 +1,8 @@
+import asyncio
 import time
 from datetime import datetime, timezone
+from threading import Lock
+from typing import List, Tuple
 
 
 class Snowflake:
@@ -22,11 +25,18 @@ class Snowflake:
     def mask(x):
         return -1 ^ (-1 << x)
 
+    @staticmethod
     def sleep(x):
         return time.sleep(x / 1000)
 
-    def get_timestamp(x):
-        return int(time.time() * 1000)
+    @staticmethod
+    def get_timestamp():
+        return time.time_ns() // 1_000_000
+
+    # how many milliseconds the generator may run ahead of the wall clock
+    # when it borrows future timestamps (sequence overflow or a clock that
+    # stepped backwards) before it blocks and waits for the clock
+    max_drift = 5
 
     sequence_bits = 10
     sequence_mask = mask(sequence_bits)
@@ -47,11 +57,15 @@ class Snowflake:
     timestamp_shift = process_bits + sequence_bits + instance_bits
     timestamp = -1
 
+    # largest signed BIGINT, what uids must fit in once stored
+    max_id = (1 << 63) - 1
+
     def __new__(cls, *args, **kwds):
         cls.instance_id = (cls.instance_id + 1) & cls.instance_mask
         return super(Snowflake, cls).__new__(cls)
 
     def __init__(self, snowflake: int = 0, process_id: int = 0):
+        self.mutex = Lock()
         self.instance_id = self.instance_id
         self.sequence = 0
         self.last_timestamp = 0
@@ -72,34 +86,117 @@ class Snowflake:
         return f"{self.__class__.__name__}({str(self)})"
 
     def __next__(self):
-        self.snowflake = next(iter(self))
+        self.snowflake = self.next_id()
         return self
 
     def __iter__(self):
         while True:
-            timestamp = self.get_timestamp()
+            yield self.next_id()
 
-            if self.last_timestamp == timestamp:
-                timestamp = self.get_timestamp()
-                self.sequence = (self.sequence + 1) & self.sequence_mask
-            else:
+    def _borrow(self, timestamp: int) -> int:
+        """
+        Move on to the next millisecond once the sequence of the current one
+        is exhausted. The generator never reuses a (timestamp, sequence)
+        pair, so when the clock has not caught up it runs ahead of it.
+        Returns how long (ms) to wait for it to be at most `max_drift` ms
+        in front.
+        """
+        self.last_timestamp += 1
+        self.sequence = 0
+        return max(self.last_timestamp - timestamp - self.max_drift, 0)
+
+    def _base(self, timestamp: int) -> int:
+        return (
+            ((timestamp - self.initial_epoch) << self.timestamp_shift)
+            | ((self.process_id & self.process_mask) << self.process_shift)
+            | ((self.instance_id & self.instance_mask) << self.instance_shift)
+        )
+
+    def _reserve(self) -> Tuple[int, int]:
+        wait = 0
+        with self.mutex:
+            timestamp = self.get_timestamp()
+            if timestamp > self.last_timestamp:
+                self.last_timestamp = timestamp
                 self.sequence = 0
+            else:
+                self.sequence += 1
+                if self.sequence > self.sequence_mask:
+                    wait = self._borrow(timestamp)
+            return self._base(self.last_timestamp) | self.sequence, wait
 
-            self.last_timestamp = timestamp
+    def next_id(self, block: bool = True) -> int:
+        """
+        Generate the next snowflake. Thread safe and strictly monotonic.
 
-            b_timestamp = (timestamp - self.initial_epoch) << self.timestamp_shift
-            b_process = (self.process_id & self.process_mask) << self.process_shift
-            b_instance = (self.instance_id & self.instance_mask) << self.instance_shift
-            b_sequence = self.sequence & self.sequence_mask
+        A clock that steps backwards is ridden out on the last seen
+        timestamp instead of producing ids that were already handed out.
+        With `block=False` the generator never sleeps, it keeps running
+        ahead of the clock instead.
+        """
+        _id, wait = self._reserve()
+        if wait and block:
+            self.sleep(wait)
+        return _id
+
+    async def next_id_async(self) -> int:
+        """Same as `next_id` but yields to the event loop while waiting"""
+        _id, wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait / 1000)
+        return _id
+
+    def next_batch(self, n: int) -> List[int]:
+        """
+        Reserve `n` snowflakes in one call.
 
-            yield b_timestamp | b_process | b_instance | b_sequence
+        Sequence numbers are handed out in contiguous blocks per
+        millisecond, so each block is a plain integer range.
+        """
+        uids: List[int] = []
+        with self.mutex:
+            while len(uids) < n:
+                timestamp = self.get_timestamp()
+                if timestamp > self.last_timestamp:
+                    self.last_timestamp = timestamp
+                    start = 0
+                else:
+                    start = self.sequence + 1
+                    if start > self.sequence_mask:
+                        wait = self._borrow(timestamp)
+                        if wait:
+                            self.sleep(wait)
+                        start = 0
+
+                count = min(n - len(uids), self.sequence_mask + 1 - start)
+                base = self._base(self.last_timestamp)
+                uids.extend(range(base + start, base + start + count))
+                self.sequence = start + count - 1
+
+        if uids:
+            self.snowflake = uids[-1]
+        return uids
+
+    @classmethod
+    def bounds(cls, start: datetime, end: datetime) -> Tuple[int, int]:
+        """
+        Smallest and largest snowflake that can be generated between
+        `start` and `end` (both inclusive, millisecond precision), clamped
+        to what fits a BIGINT.
+        """
+        lo = max(int(start.timestamp() * 1000) - cls.initial_epoch, 0)
+        hi = max(int(end.timestamp() * 1000) - cls.initial_epoch + 1, 0)
+        return (
+            min(lo << cls.timestamp_shift, cls.max_id),
+            min((hi << cls.timestamp_shift) - 1, cls.max_id),
+        )
 
     @property
     def timestamp(self):
         """
         Get the timestamp of the current snowflake.
         """
-        return float((int(self) >> 22) + self.initial_epoch) / 1000
+        return float((int(self) >> self.timestamp_shift) + self.initial_epoch) / 1000
 
     @property
     def to_date(self, format="%d-%m-%Y | %H:%M:%S"):
@@ -1,15 +1,18 @@
+import asyncio
 import datetime
 import ipaddress
 from socket import gethostbyname, gethostname
 from threading import Lock
 from time import sleep
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 BIT_LEN_TIME = 39
 BIT_LEN_SEQUENCE = 8
 BIT_LEN_MACHINE_ID = 63 - (BIT_LEN_TIME + BIT_LEN_SEQUENCE)
 UTC = datetime.timezone.utc
 SONYFLAKE_EPOCH = datetime.datetime(2023, 1, 1, 0, 0, 0, tzinfo=UTC)
+# largest signed BIGINT, what IDs must fit in once stored
+MAX_ID = (1 << 63) - 1
 
 
 def lower_16bit_private_ip() -> int:
@@ -113,6 +116,10 @@ class SonyFlake:
     def machine_id(self) -> int:
         return self._machine_id
 
+    @machine_id.setter
+    def machine_id(self, value: int):
+        self._machine_id = value & ((1 << BIT_LEN_MACHINE_ID) - 1)
+
     def current_time(self) -> int:
         """
         Get current UTC time in the SonyFlake's time value.
@@ -133,25 +140,82 @@ class SonyFlake:
     def __iter__(self):
         yield self.next_id()
 
-    def next_id(self) -> int:
+    def _reserve(self) -> Tuple[int, int]:
+        """
+        Take the next sequence slot, borrowing the next time tick when the
+        sequence wraps. Returns the id and how many ticks it is ahead of
+        the clock. The caller must hold the mutex.
+        """
+        mask_sequence = (1 << BIT_LEN_SEQUENCE) - 1
+        overtime = 0
+        current_time = self.current_elapsed_time()
+        if self.elapsed_time < current_time:
+            self.elapsed_time = current_time
+            self.sequence = 0
+        else:
+            self.sequence = (self.sequence + 1) & mask_sequence
+            if self.sequence == 0:
+                self.elapsed_time += 1
+                overtime = self.elapsed_time - current_time
+        return self.to_id(), overtime
+
+    def next_id(self, block: bool = True) -> int:
         """
         Generates and returns the next unique ID.
 
+        When the sequence wraps, waits for the borrowed time tick after
+        releasing the mutex. With `block=False` the borrowed id is
+        returned straight away, which keeps event loop threads responsive.
+
         Raises a `TimeoutError` after the `SonyFlake` time overflows.
         """
+        with self.mutex:
+            _id, overtime = self._reserve()
+        if overtime and block:
+            sleep(self.sleep_time(overtime))
+        return _id
+
+    async def next_id_async(self) -> int:
+        """
+        Same as `next_id` but yields to the event loop instead of
+        blocking it while waiting for a borrowed time tick.
+        """
+        with self.mutex:
+            _id, overtime = self._reserve()
+        if overtime:
+            await asyncio.sleep(self.sleep_time(overtime))
+        return _id
+
+    def next_ids(self, n: int) -> List[int]:
+        """
+        Reserve `n` unique IDs in one call.
+
+        Sequence numbers are taken in contiguous blocks per time tick,
+        sleeping once per exhausted block rather than once per ID.
+        """
         mask_sequence = (1 << BIT_LEN_SEQUENCE) - 1
+        step = 1 << BIT_LEN_MACHINE_ID
+        ids: List[int] = []
         with self.mutex:
-            current_time = self.current_elapsed_time()
-            if self.elapsed_time < current_time:
-                self.elapsed_time = current_time
-                self.sequence = 0
-            else:
-                self.sequence = (self.sequence + 1) & mask_sequence
-                if self.sequence == 0:
-                    self.elapsed_time += 1
-                    overtime = self.elapsed_time - current_time
-                    sleep(self.sleep_time(overtime))
-            return self.to_id()
+            while len(ids) < n:
+                current_time = self.current_elapsed_time()
+                if self.elapsed_time < current_time:
+                    self.elapsed_time = current_time
+                    start = 0
+                else:
+                    start = self.sequence + 1
+                    if start > mask_sequence:
+                        self.elapsed_time += 1
+                        start = 0
+                        overtime = self.elapsed_time - current_time
+                        sleep(self.sleep_time(overtime))
+
+                count = min(n - len(ids), mask_sequence + 1 - start)
+                self.sequence = start
+                base = self.to_id()
+                ids.extend(range(base, base + count * step, step))
+                self.sequence = start + count - 1
+        return ids
 
     def to_id(self) -> int:
         if self.elapsed_time >= (1 << BIT_LEN_TIME):
@@ -166,8 +230,21 @@ class SonyFlake:
         Calculate the time remaining until generation of new ID.
         """
         return (
-            duration * 10 - (datetime.datetime.now(UTC).timestamp() * 100) % 1
-        ) / 100
+            duration * 10 - (datetime.datetime.now(UTC).timestamp() * 1000) % 10
+        ) / 1000
+
+    def bounds(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> Tuple[int, int]:
+        """
+        Smallest and largest ID that can be generated between `start`
+        and `end` (both inclusive, SonyFlake time precision), clamped to
+        what fits a BIGINT.
+        """
+        shift = BIT_LEN_SEQUENCE + BIT_LEN_MACHINE_ID
+        lo = max(self.to_sonyflake_time(start) - self.start_time, 0)
+        hi = max(self.to_sonyflake_time(end) - self.start_time + 1, 0)
+        return min(lo << shift, MAX_ID), min((hi << shift) - 1, MAX_ID)
 
     @staticmethod
     def decompose(_id: int) -> Dict[str, int]:
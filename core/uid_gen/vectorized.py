@@ -0,0 +1,121 @@
+"""
+Bulk (NumPy backed) decoding of Snowflake and SonyFlake ids for offline
+analytics, e.g. bucketing millions of ids by time or by worker.
+
+NumPy is not a runtime dependency of the service, install it in the
+environment that runs these jobs.
+"""
+from typing import Any, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from .snow_flake import Snowflake
+from .sony_flake import (BIT_LEN_MACHINE_ID, BIT_LEN_SEQUENCE, MAX_ID,
+                         SONYFLAKE_EPOCH, SonyFlake)
+
+SNOWFLAKE_FIELDS = [
+    ("timestamp", "i8"),  # unix epoch milliseconds
+    ("process_id", "u1"),
+    ("instance_id", "u1"),
+    ("sequence", "u2"),
+]
+
+SONYFLAKE_FIELDS = [
+    ("time", "i8"),  # sonyflake ticks (10ms) since start_time
+    ("timestamp", "i8"),  # unix epoch milliseconds
+    ("machine_id", "u2"),
+    ("sequence", "u1"),
+]
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for bulk uid decoding")
+
+
+def _as_ids(ids: Any) -> "np.ndarray":
+    """Accepts int arrays as well as the string uids stored in the database"""
+    arr = np.asarray(ids)
+    if arr.dtype.kind in "OSU":
+        return arr.astype(np.int64)
+    return arr.astype(np.int64, copy=False)
+
+
+def _as_unix_ms(values: Any) -> "np.ndarray":
+    """datetime64 arrays, datetime objects or unix epoch milliseconds"""
+    arr = np.asarray(values)
+    if arr.dtype.kind == "M":
+        return arr.astype("datetime64[ms]").astype(np.int64)
+    if arr.dtype.kind == "O":
+        return np.fromiter(
+            (int(v.timestamp() * 1000) for v in arr.ravel()),
+            dtype=np.int64,
+            count=arr.size,
+        ).reshape(arr.shape)
+    return arr.astype(np.int64, copy=False)
+
+
+def decode_snowflakes(ids: Any) -> "np.ndarray":
+    """Vectorized `Snowflake.timestamp` and friends, one record per id"""
+    _require_numpy()
+    arr = _as_ids(ids)
+    out = np.empty(arr.shape, dtype=SNOWFLAKE_FIELDS)
+    out["timestamp"] = (arr >> Snowflake.timestamp_shift) + Snowflake.initial_epoch
+    out["process_id"] = (arr >> Snowflake.process_shift) & Snowflake.process_mask
+    out["instance_id"] = (arr >> Snowflake.instance_shift) & Snowflake.instance_mask
+    out["sequence"] = arr & Snowflake.sequence_mask
+    return out
+
+
+def decode_sonyflakes(ids: Any, start_time: Optional[int] = None) -> "np.ndarray":
+    """
+    Vectorized `SonyFlake.decompose`. `start_time` is in SonyFlake time
+    units and defaults to the SonyFlake epoch.
+    """
+    _require_numpy()
+    if start_time is None:
+        start_time = SonyFlake.to_sonyflake_time(SONYFLAKE_EPOCH)
+    arr = _as_ids(ids)
+    out = np.empty(arr.shape, dtype=SONYFLAKE_FIELDS)
+    out["time"] = arr >> (BIT_LEN_SEQUENCE + BIT_LEN_MACHINE_ID)
+    out["timestamp"] = (out["time"] + start_time) * 10
+    out["machine_id"] = arr & ((1 << BIT_LEN_MACHINE_ID) - 1)
+    out["sequence"] = (arr >> BIT_LEN_MACHINE_ID) & ((1 << BIT_LEN_SEQUENCE) - 1)
+    return out
+
+
+def _bounds(lo: "np.ndarray", hi: "np.ndarray", shift: int):
+    """
+    Uid ranges of the tick ranges [lo, hi), clamped to BIGINT like the
+    scalar bounds. Shifting int64 past that would silently wrap around.
+    """
+    top = MAX_ID >> shift
+    return (
+        np.where(lo > top, MAX_ID, np.minimum(lo, top) << shift),
+        np.where(hi > top, MAX_ID, (np.minimum(hi, top) << shift) - 1),
+    )
+
+
+def snowflake_bounds(starts: Any, ends: Any) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Vectorized `Snowflake.bounds`: inclusive uid ranges per time window"""
+    _require_numpy()
+    shift = Snowflake.timestamp_shift
+    lo = np.maximum(_as_unix_ms(starts) - Snowflake.initial_epoch, 0)
+    hi = np.maximum(_as_unix_ms(ends) - Snowflake.initial_epoch + 1, 0)
+    return _bounds(lo, hi, shift)
+
+
+def sonyflake_bounds(
+    starts: Any, ends: Any, start_time: Optional[int] = None
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Vectorized `SonyFlake.bounds`: inclusive uid ranges per time window"""
+    _require_numpy()
+    if start_time is None:
+        start_time = SonyFlake.to_sonyflake_time(SONYFLAKE_EPOCH)
+    shift = BIT_LEN_SEQUENCE + BIT_LEN_MACHINE_ID
+    lo = np.maximum(_as_unix_ms(starts) // 10 - start_time, 0)
+    hi = np.maximum(_as_unix_ms(ends) // 10 - start_time + 1, 0)
+    return _bounds(lo, hi, shift)
@@ -0,0 +1,101 @@
+"""
+Event loop lag while SonyFlake ids are generated in exhaustion bursts.
+
+    python -m scripts.bench_loop_lag [--bursts 20] [--burst-size 1024]
+
+A probe coroutine asks for a 1 ms sleep in a loop and records how late it
+wakes up, while burst tasks each take `--burst-size` ids at once, well
+past the 256 ids per 10 ms tick. Compares blocking `next_id()` (the
+behaviour before async generation), `next_id(block=False)` as used by
+model defaults on the loop, and `await next_id_async()`. Also times
+`next_ids(n)` against the ideal clock bound.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from core.uid_gen.sony_flake import BIT_LEN_SEQUENCE, SonyFlake
+
+PROBE_INTERVAL = 0.001
+IDS_PER_SECOND = (1 << BIT_LEN_SEQUENCE) * 100
+
+
+async def probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def burst(generate, size: int):
+    for _ in range(size):
+        await generate()
+        await asyncio.sleep(0)  # like a request handler between inserts
+
+
+async def measure(generate, bursts: int, burst_size: int):
+    lags: list = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await asyncio.gather(*(burst(generate, burst_size) for _ in range(bursts)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await prober
+    return lags, elapsed
+
+
+def percentile(values: list, q: int) -> float:
+    return (
+        statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+        if len(values) > 1
+        else 0.0
+    )
+
+
+async def run(bursts: int, burst_size: int):
+    ids = bursts * burst_size
+    print(f"{bursts} bursts of {burst_size} ids, ideal {ids / IDS_PER_SECOND:.3f}s")
+    print(f"{'mode':<24}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'total s':>10}")
+    modes = [
+        ("next_id() blocking", lambda sony: _sync(sony.next_id)),
+        ("next_id(block=False)", lambda sony: _sync(lambda: sony.next_id(False))),
+        ("await next_id_async()", lambda sony: sony.next_id_async),
+    ]
+    for name, make in modes:
+        lags, elapsed = await measure(make(SonyFlake()), bursts, burst_size)
+        lags_ms = [1000 * lag for lag in lags]
+        print(
+            f"{name:<24}{percentile(lags_ms, 50):>9.2f}{percentile(lags_ms, 99):>9.2f}"
+            f"{max(lags_ms, default=0.0):>9.2f}{elapsed:>10.3f}"
+        )
+
+
+def _sync(fn):
+    async def generate():
+        return fn()
+
+    return generate
+
+
+def batch(n: int):
+    sony = SonyFlake()
+    start = time.perf_counter()
+    sony.next_ids(n)
+    elapsed = time.perf_counter() - start
+    print(f"next_ids({n}): {elapsed:.3f}s, ideal {n / IDS_PER_SECOND:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=1024)
+    args = parser.parse_args()
+    asyncio.run(run(args.bursts, args.burst_size))
+    batch(10 * (1 << BIT_LEN_SEQUENCE))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Per call latency of hot uid lookups, cached statements against statements
+built on every call.
+
+    python -m scripts.bench_statements [--rows 10000] [--lookups 20000]
+                                       [--url postgresql+asyncpg://...]
+
+Loads `--rows` rows into a scratch table, dropped again at the end, and
+looks random uids up through one session. "built per call" is what
+find() did before, `select(model).where(model.uid == uid)`; "cached" runs
+the registry statement of core/database/statements.py with the uid bound
+at execution. "build only" times constructing the statement without
+executing it.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import Column, MetaData, String, Table, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import registry, sessionmaker
+
+from core.config import settings
+from core.database import statements
+from core.uid_gen import FelicitySAID, get_flake_uids
+
+metadata = MetaData()
+bench_table = Table(
+    "bench_statements",
+    metadata,
+    Column("uid", FelicitySAID, primary_key=True),
+    Column("name", String),
+)
+
+
+class BenchEntity:
+    pass
+
+
+registry(metadata=metadata).map_imperatively(BenchEntity, bench_table)
+
+
+def percentile(values: list, q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def time_lookups(session, make, sample: list) -> list:
+    timings = []
+    for uid in sample:
+        start = time.perf_counter()
+        stmt, params = make(uid)
+        result = await session.execute(stmt, params)
+        result.scalars().one_or_none()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def time_builds(make, sample: list) -> list:
+    timings = []
+    for uid in sample:
+        start = time.perf_counter()
+        make(uid)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def built(uid):
+    return select(BenchEntity).where(BenchEntity.uid == uid), None
+
+
+def cached(uid):
+    return statements.find_by_uid(BenchEntity), {"uid": uid}
+
+
+async def run(url: str, rows: int, lookups: int):
+    engine = create_async_engine(url)
+    factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    uids = get_flake_uids(rows)
+    sample = [random.choice(uids) for _ in range(lookups)]
+    async with engine.begin() as connection:
+        await connection.run_sync(metadata.drop_all)
+        await connection.run_sync(metadata.create_all)
+        await connection.execute(
+            bench_table.insert(), [{"uid": uid, "name": "name"} for uid in uids]
+        )
+    try:
+        print(f"{rows:,} rows, {lookups:,} lookups, {engine.dialect.name}")
+        print(f"{'statement':<26}{'p50 us':>9}{'p99 us':>9}{'calls/s':>10}")
+        cases = [("built per call", built), ("cached", cached)]
+        async with factory() as session:
+            for name, make in cases:
+                await time_lookups(session, make, sample[:1000])  # warm up
+                timings = await time_lookups(session, make, sample)
+                session.expunge_all()
+                report(name, timings)
+        for name, make in cases:
+            report(f"{name}, build only", time_builds(make, sample))
+    finally:
+        async with engine.begin() as connection:
+            await connection.run_sync(metadata.drop_all)
+        await engine.dispose()
+
+
+def report(name: str, timings: list):
+    timings_us = [1e6 * t for t in timings]
+    print(
+        f"{name:<26}{percentile(timings_us, 50):>9.1f}"
+        f"{percentile(timings_us, 99):>9.1f}{len(timings) / sum(timings):>10.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--url", default=str(settings.SQLALCHEMY_ASYNC_DATABASE_URI))
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.rows, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Batch uid reservation against the per-call path.
+
+    python -m scripts.bench_uid [-n 100000] [--repeat 3]
+
+Both generators hand out a bounded number of ids per tick (1024/ms for
+Snowflake, 256/10ms for SonyFlake), so large batches are clock bound;
+the gap to the per-call path is the per-id overhead.
+"""
+import argparse
+import statistics
+import time
+from typing import Tuple
+
+from core.uid_gen import get_flake_uid, get_flake_uids
+from core.uid_gen.snow_flake import Snowflake
+from core.uid_gen.sony_flake import SonyFlake
+
+
+def best_of(repeat: int, fn) -> Tuple[float, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", type=int, default=100_000, help="ids per run")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    n = args.n
+
+    snow = Snowflake()
+    sony = SonyFlake()
+    cases = [
+        ("get_flake_uid() x n", lambda: [get_flake_uid() for _ in range(n)]),
+        ("get_flake_uids(n)", lambda: get_flake_uids(n)),
+        ("Snowflake.next_id() x n", lambda: [snow.next_id() for _ in range(n)]),
+        ("Snowflake.next_batch(n)", lambda: snow.next_batch(n)),
+        ("SonyFlake.next_id() x n", lambda: [sony.next_id() for _ in range(n)]),
+        ("SonyFlake.next_ids(n)", lambda: sony.next_ids(n)),
+    ]
+
+    print(f"{'case':<28}{'best s':>10}{'median s':>10}{'ids/s':>14}")
+    for name, fn in cases:
+        best, median = best_of(args.repeat, fn)
+        print(f"{name:<28}{best:>10.4f}{median:>10.4f}{n / best:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+NumPy bulk uid decoding against the scalar, one id at a time, path.
+
+    python -m scripts.bench_uid_decode [-n 1000000]
+
+Needs NumPy (`poetry install --extras analytics`). Checks that both
+paths agree on a sample before timing them.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from core.uid_gen import vectorized
+from core.uid_gen.snow_flake import Snowflake
+from core.uid_gen.sony_flake import SonyFlake
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def snowflake_scalar(ids):
+    return [round(Snowflake(uid).timestamp * 1000) for uid in ids]
+
+
+def sonyflake_scalar(ids):
+    return [SonyFlake.decompose(uid) for uid in ids]
+
+
+def bounds_scalar(windows):
+    return [Snowflake.bounds(start, end) for start, end in windows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", type=int, default=1_000_000)
+    args = parser.parse_args()
+    n = args.n
+
+    snow_ids = Snowflake().next_batch(n)
+    # 25,600 SonyFlake ids per second at most, repeat a smaller batch
+    sony_ids = SonyFlake().next_ids(min(n, 10_000))
+    sony_ids = (sony_ids * (n // len(sony_ids) + 1))[:n]
+    now = datetime.now(timezone.utc)
+    windows = [
+        (now - timedelta(minutes=i + 1), now - timedelta(minutes=i)) for i in range(n)
+    ]
+    starts = np.array(
+        [w[0].replace(tzinfo=None) for w in windows], dtype="datetime64[ms]"
+    )
+    ends = np.array(
+        [w[1].replace(tzinfo=None) for w in windows], dtype="datetime64[ms]"
+    )
+
+    sample = slice(0, 1000)
+    decoded = vectorized.decode_snowflakes(snow_ids[sample])
+    assert decoded["timestamp"].tolist() == snowflake_scalar(snow_ids[sample])
+    decoded = vectorized.decode_sonyflakes(sony_ids[sample])
+    assert decoded["machine_id"].tolist() == [
+        d["machine_id"] for d in sonyflake_scalar(sony_ids[sample])
+    ]
+    lo, hi = vectorized.snowflake_bounds(starts[sample], ends[sample])
+    assert list(zip(lo.tolist(), hi.tolist())) == bounds_scalar(windows[sample])
+
+    snow_array = np.array(snow_ids, dtype=np.int64)
+    sony_array = np.array(sony_ids, dtype=np.int64)
+    cases = [
+        (
+            "Snowflake decode",
+            lambda: snowflake_scalar(snow_ids),
+            lambda: vectorized.decode_snowflakes(snow_array),
+        ),
+        (
+            "SonyFlake decompose",
+            lambda: sonyflake_scalar(sony_ids),
+            lambda: vectorized.decode_sonyflakes(sony_array),
+        ),
+        (
+            "Snowflake bounds",
+            lambda: bounds_scalar(windows),
+            lambda: vectorized.snowflake_bounds(starts, ends),
+        ),
+    ]
+    print(f"{n:,} ids")
+    print(f"{'case':<22}{'scalar s':>10}{'numpy s':>10}{'speedup':>10}")
+    for name, scalar, bulk in cases:
+        scalar_s = timed(scalar)
+        bulk_s = timed(bulk)
+        print(f"{name:<22}{scalar_s:>10.3f}{bulk_s:>10.4f}{scalar_s / bulk_s:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Primary key index size and lookup speed, text uids against BIGINT uids.
+
+    python -m scripts.bench_uid_index [--rows 1000000] [--lookups 20000]
+                                      [--dsn postgresql://...]
+
+Loads the same Snowflake ids into two temporary tables, one keyed by
+VARCHAR (the default mode) and one by BIGINT (UID_BIGINT=True). It then
+compares the size of their primary key indexes and the latency of
+prepared point lookups and of a self join. Temporary tables are dropped
+with the connection, nothing is left in the database.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import asyncpg
+
+from core.config import settings
+from core.uid_gen.snow_flake import Snowflake
+
+KINDS = [("text", "VARCHAR", str), ("bigint", "BIGINT", int)]
+
+
+async def load(connection, table: str, sql_type: str, uids: list):
+    await connection.execute(
+        f"CREATE TEMP TABLE {table} (uid {sql_type} PRIMARY KEY, name TEXT)"
+    )
+    await connection.copy_records_to_table(
+        table, records=[(uid, "name") for uid in uids], columns=["uid", "name"]
+    )
+    await connection.execute(f"ANALYZE {table}")
+
+
+async def lookups(connection, table: str, sample: list) -> list:
+    stmt = await connection.prepare(f"SELECT name FROM {table} WHERE uid = $1")
+    timings = []
+    for uid in sample:
+        start = time.perf_counter()
+        await stmt.fetchval(uid)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def self_join(connection, table: str) -> float:
+    start = time.perf_counter()
+    await connection.fetchval(
+        f"SELECT count(*) FROM {table} a JOIN {table} b ON a.uid = b.uid"
+    )
+    return time.perf_counter() - start
+
+
+async def run(dsn: str, rows: int, sample_size: int):
+    ids = Snowflake().next_batch(rows)
+    sample = random.sample(ids, min(sample_size, rows))
+    connection = await asyncpg.connect(dsn)
+    try:
+        print(f"{rows:,} rows, {len(sample):,} lookups")
+        print(
+            f"{'uid type':<10}{'index MB':>10}{'table MB':>10}"
+            f"{'p50 us':>9}{'p99 us':>9}{'join s':>9}"
+        )
+        for kind, sql_type, convert in KINDS:
+            table = f"bench_uid_{kind}"
+            await load(connection, table, sql_type, [convert(uid) for uid in ids])
+            index_size = await connection.fetchval(
+                "SELECT pg_relation_size($1::text::regclass)", f"{table}_pkey"
+            )
+            table_size = await connection.fetchval(
+                "SELECT pg_relation_size($1::text::regclass)", table
+            )
+            timings = await lookups(connection, table, [convert(uid) for uid in sample])
+            timings_us = sorted(1e6 * t for t in timings)
+            p99 = timings_us[int(0.99 * (len(timings_us) - 1))]
+            joined = await self_join(connection, table)
+            print(
+                f"{kind:<10}{index_size / 2**20:>10.1f}{table_size / 2**20:>10.1f}"
+                f"{statistics.median(timings_us):>9.1f}{p99:>9.1f}{joined:>9.3f}"
+            )
+    finally:
+        await connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--dsn", default=str(settings.SQLALCHEMY_DATABASE_URI))
+    args = parser.parse_args()
+    asyncio.run(run(args.dsn, args.rows, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
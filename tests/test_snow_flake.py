@@ -0,0 +1,122 @@
+import threading
+import time
+from typing import Callable, Tuple
+
+from core.uid_gen.snow_flake import Snowflake
+
+THREADS = 8
+IDS_PER_THREAD = 50_000
+
+
+class FakeClock:
+    """Millisecond clock driven by the test, sleeping advances it"""
+
+    def __init__(self, now: int):
+        self.now = now
+        self.slept = 0
+
+    def get_timestamp(self) -> int:
+        return self.now
+
+    def sleep(self, ms: int):
+        self.slept += ms
+        self.now += ms
+
+
+def frozen_snowflake(now: int) -> Tuple[Snowflake, FakeClock]:
+    snow = Snowflake()
+    clock = FakeClock(now)
+    snow.get_timestamp = clock.get_timestamp
+    snow.sleep = clock.sleep
+    snow.last_timestamp = 0  # forget the id generated on construction
+    return snow, clock
+
+
+def slowest_call_during(background: Callable[[], None], call: Callable[[], int]):
+    """Worst latency of `call`, made repeatedly while `background` runs"""
+    thread = threading.Thread(target=background)
+    thread.start()
+    slowest, calls = 0.0, 0
+    while thread.is_alive():
+        start = time.perf_counter()
+        call()
+        slowest = max(slowest, time.perf_counter() - start)
+        calls += 1
+        time.sleep(0.001)  # an event loop does other work between inserts
+    thread.join()
+    return slowest, calls
+
+
+def test_unique_under_threads():
+    snow = Snowflake()
+    results = [[] for _ in range(THREADS)]
+    start = threading.Barrier(THREADS)
+
+    def generate(out):
+        start.wait()
+        for _ in range(IDS_PER_THREAD // 2):
+            out.append(snow.next_id())
+        out.extend(snow.next_batch(IDS_PER_THREAD // 2))
+
+    threads = [threading.Thread(target=generate, args=(r,)) for r in results]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    uids = [uid for result in results for uid in result]
+    assert len(uids) == THREADS * IDS_PER_THREAD
+    assert len(set(uids)) == len(uids)
+    for result in results:
+        # every thread sees strictly increasing ids
+        assert all(a < b for a, b in zip(result, result[1:]))
+
+
+def test_sequence_overflow_borrows_next_millisecond():
+    snow, _ = frozen_snowflake(Snowflake.initial_epoch + 1000)
+    uids = [snow.next_id() for _ in range(3 * (Snowflake.sequence_mask + 1))]
+
+    assert len(set(uids)) == len(uids)
+    assert all(a < b for a, b in zip(uids, uids[1:]))
+    timestamps = {uid >> Snowflake.timestamp_shift for uid in uids}
+    assert len(timestamps) == 3
+
+
+def test_clock_regression_stays_monotonic():
+    snow, clock = frozen_snowflake(Snowflake.initial_epoch + 1000)
+    before = [snow.next_id() for _ in range(10)]
+    clock.now -= 500  # e.g. an NTP step backwards
+    after = [snow.next_id() for _ in range(10)] + snow.next_batch(10)
+
+    uids = before + after
+    assert len(set(uids)) == len(uids)
+    assert all(a < b for a, b in zip(uids, uids[1:]))
+    # ridden out on the last seen timestamp, not the stepped back clock
+    assert after[0] >> Snowflake.timestamp_shift == 1000
+
+
+def test_blocks_once_too_far_ahead_of_the_clock():
+    snow, clock = frozen_snowflake(Snowflake.initial_epoch + 1000)
+    per_ms = Snowflake.sequence_mask + 1
+    for _ in range((Snowflake.max_drift + 2) * per_ms):
+        snow.next_id()
+    assert clock.slept > 0
+    assert snow.last_timestamp - clock.now <= Snowflake.max_drift
+
+
+def test_non_blocking_never_sleeps():
+    snow, clock = frozen_snowflake(Snowflake.initial_epoch + 1000)
+    per_ms = Snowflake.sequence_mask + 1
+    uids = [snow.next_id(block=False) for _ in range(20 * per_ms)]
+    assert clock.slept == 0
+    assert len(set(uids)) == len(uids)
+
+
+def test_non_blocking_not_held_up_by_a_batch():
+    snow = Snowflake()
+    # ~300 ms worth of sequence numbers, the batch waits for the clock
+    slowest, calls = slowest_call_during(
+        lambda: snow.next_batch(300_000), lambda: snow.next_id(block=False)
+    )
+    assert calls > 0
+    assert slowest < 0.05
@@ -0,0 +1,20 @@
+from core.uid_gen.sony_flake import SonyFlake
+
+from .test_snow_flake import slowest_call_during
+
+
+def test_next_ids_unique_and_increasing():
+    sony = SonyFlake(machine_id=lambda: 1)
+    ids = sony.next_ids(1000) + [sony.next_id() for _ in range(300)]
+    assert len(set(ids)) == len(ids)
+    assert all(a < b for a, b in zip(ids, ids[1:]))
+
+
+def test_non_blocking_not_held_up_by_a_batch():
+    sony = SonyFlake(machine_id=lambda: 1)
+    # 256 ids per 10 ms tick, the batch waits for the clock ~200 ms
+    slowest, calls = slowest_call_during(
+        lambda: sony.next_ids(5000), lambda: sony.next_id(block=False)
+    )
+    assert calls > 0
+    assert slowest < 0.05